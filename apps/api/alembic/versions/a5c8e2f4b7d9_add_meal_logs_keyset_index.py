@@ -0,0 +1,25 @@
+"""Add (user_id, created_at, id) index on meal_logs
+
+Revision ID: a5c8e2f4b7d9
+Revises: f1b7d3e9c5a2
+Create Date: 2026-10-16 17:22:09.518364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c8e2f4b7d9'
+down_revision: Union[str, None] = 'f1b7d3e9c5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_meal_logs_user_created_id', 'meal_logs', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_meal_logs_user_created_id', table_name='meal_logs')
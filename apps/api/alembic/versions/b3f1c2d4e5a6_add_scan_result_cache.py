@@ -0,0 +1,44 @@
+"""Add scan_result_cache table
+
+Revision ID: b3f1c2d4e5a6
+Revises: 0d7e6aca5158
+Create Date: 2026-10-16 10:12:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2d4e5a6'
+down_revision: Union[str, None] = '0d7e6aca5158'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scan_result_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('model_name', sa.String(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scan_result_cache_id'), 'scan_result_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_scan_result_cache_cache_key'), 'scan_result_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_scan_result_cache_created_at'), 'scan_result_cache', ['created_at'], unique=False)
+    op.create_index(op.f('ix_scan_result_cache_expires_at'), 'scan_result_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scan_result_cache_expires_at'), table_name='scan_result_cache')
+    op.drop_index(op.f('ix_scan_result_cache_created_at'), table_name='scan_result_cache')
+    op.drop_index(op.f('ix_scan_result_cache_cache_key'), table_name='scan_result_cache')
+    op.drop_index(op.f('ix_scan_result_cache_id'), table_name='scan_result_cache')
+    op.drop_table('scan_result_cache')
@@ -0,0 +1,26 @@
+"""Add run_after to scan_jobs
+
+Revision ID: b9d2f6a8c3e1
+Revises: a5c8e2f4b7d9
+Create Date: 2026-10-17 09:41:27.603215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d2f6a8c3e1'
+down_revision: Union[str, None] = 'a5c8e2f4b7d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scan_jobs', sa.Column('run_after', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('scan_jobs', 'run_after')
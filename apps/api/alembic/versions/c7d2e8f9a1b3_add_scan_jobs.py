@@ -0,0 +1,52 @@
+"""Add scan_jobs table
+
+Revision ID: c7d2e8f9a1b3
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-16 11:02:17.540921
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e8f9a1b3'
+down_revision: Union[str, None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scan_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('image_data', sa.LargeBinary(), nullable=True),
+        sa.Column('content_type', sa.String(), nullable=False),
+        sa.Column('detail', sa.String(), nullable=False),
+        sa.Column('plate_size_cm', sa.Float(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('error_status', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'idempotency_key', name='uq_scan_jobs_user_key')
+    )
+    op.create_index(op.f('ix_scan_jobs_user_id'), 'scan_jobs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_scan_jobs_status'), 'scan_jobs', ['status'], unique=False)
+    op.create_index(op.f('ix_scan_jobs_created_at'), 'scan_jobs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scan_jobs_created_at'), table_name='scan_jobs')
+    op.drop_index(op.f('ix_scan_jobs_status'), table_name='scan_jobs')
+    op.drop_index(op.f('ix_scan_jobs_user_id'), table_name='scan_jobs')
+    op.drop_table('scan_jobs')
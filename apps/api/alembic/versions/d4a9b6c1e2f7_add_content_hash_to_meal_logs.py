@@ -0,0 +1,28 @@
+"""Add content_hash to meal_logs
+
+Revision ID: d4a9b6c1e2f7
+Revises: c7d2e8f9a1b3
+Create Date: 2026-10-16 12:20:05.318847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a9b6c1e2f7'
+down_revision: Union[str, None] = 'c7d2e8f9a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('meal_logs', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_meal_logs_content_hash'), 'meal_logs', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_meal_logs_content_hash'), table_name='meal_logs')
+    op.drop_column('meal_logs', 'content_hash')
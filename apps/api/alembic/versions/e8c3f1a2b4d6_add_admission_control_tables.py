@@ -0,0 +1,43 @@
+"""Add admission_buckets and admission_leases tables
+
+Revision ID: e8c3f1a2b4d6
+Revises: d4a9b6c1e2f7
+Create Date: 2026-10-16 14:41:52.106233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c3f1a2b4d6'
+down_revision: Union[str, None] = 'd4a9b6c1e2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'admission_buckets',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table(
+        'admission_leases',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_admission_leases_user_id'), 'admission_leases', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_admission_leases_user_id'), table_name='admission_leases')
+    op.drop_table('admission_leases')
+    op.drop_table('admission_buckets')
@@ -0,0 +1,33 @@
+"""Add fdc_food_index table
+
+Revision ID: f1b7d3e9c5a2
+Revises: e8c3f1a2b4d6
+Create Date: 2026-10-16 16:05:37.412980
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d3e9c5a2'
+down_revision: Union[str, None] = 'e8c3f1a2b4d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'fdc_food_index',
+        sa.Column('normalized_name', sa.String(), nullable=False),
+        sa.Column('fdc_id', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('normalized_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('fdc_food_index')
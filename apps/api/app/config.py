@@ -26,6 +26,207 @@ class Settings(BaseModel):
 
     ai_model: str = os.getenv("AI_MODEL", "gpt-4o-mini")
 
+    # Vision backend: "openai", "fake", "record" or "replay"
+    # (see app/services/vision_providers.py)
+    vision_provider: str = os.getenv("VISION_PROVIDER", "openai")
+    vision_fake_fixture_path: str = os.getenv("VISION_FAKE_FIXTURE_PATH", "")
+    vision_fake_model_name: str = os.getenv("VISION_FAKE_MODEL_NAME", "fake-vision")
+    vision_fake_latency_ms: int = int(os.getenv("VISION_FAKE_LATENCY_MS", "1500"))
+    vision_fake_latency_jitter_ms: int = int(
+        os.getenv("VISION_FAKE_LATENCY_JITTER_MS", "500")
+    )
+    vision_fake_input_tokens: int = int(os.getenv("VISION_FAKE_INPUT_TOKENS", "2800"))
+    vision_fake_output_tokens: int = int(
+        os.getenv("VISION_FAKE_OUTPUT_TOKENS", "150")
+    )
+    vision_recordings_dir: str = os.getenv(
+        "VISION_RECORDINGS_DIR", "data/vision_recordings"
+    )
+    # Replay sleeps for each recording's original latency
+    vision_replay_realtime: bool = (
+        os.getenv("VISION_REPLAY_REALTIME", "false").lower() == "true"
+    )
+
+    # Shared vision model client (see app/services/llm_client.py)
+    vision_max_tokens: int = int(os.getenv("VISION_MAX_TOKENS", "1500"))
+    # Ask the API for schema-constrained JSON (OpenAI structured outputs)
+    vision_structured_output: bool = (
+        os.getenv("VISION_STRUCTURED_OUTPUT", "false").lower() == "true"
+    )
+    openai_timeout_s: float = float(os.getenv("OPENAI_TIMEOUT_S", "60"))
+    openai_max_retries: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+    openai_max_keepalive_connections: int = int(
+        os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    openai_keepalive_expiry_s: float = float(
+        os.getenv("OPENAI_KEEPALIVE_EXPIRY_S", "60")
+    )
+    openai_prewarm_connections: int = int(
+        os.getenv("OPENAI_PREWARM_CONNECTIONS", "2")
+    )
+
+    # Hedge slow vision calls with a second request after a latency percentile
+    vision_hedge_enabled: bool = (
+        os.getenv("VISION_HEDGE_ENABLED", "true").lower() == "true"
+    )
+    vision_hedge_percentile: float = float(os.getenv("VISION_HEDGE_PERCENTILE", "95"))
+    vision_hedge_min_samples: int = int(os.getenv("VISION_HEDGE_MIN_SAMPLES", "20"))
+    vision_hedge_min_delay_s: float = float(
+        os.getenv("VISION_HEDGE_MIN_DELAY_S", "2.0")
+    )
+    vision_hedge_max_delay_s: float = float(
+        os.getenv("VISION_HEDGE_MAX_DELAY_S", "20.0")
+    )
+    # At most this share of recent calls may be hedged (each hedge is billed)
+    vision_hedge_max_ratio: float = float(os.getenv("VISION_HEDGE_MAX_RATIO", "0.1"))
+    vision_latency_window: int = int(os.getenv("VISION_LATENCY_WINDOW", "200"))
+
+    # Circuit breaker: fail fast with 503 while the vision API is erroring
+    vision_breaker_enabled: bool = (
+        os.getenv("VISION_BREAKER_ENABLED", "true").lower() == "true"
+    )
+    vision_breaker_failure_rate: float = float(
+        os.getenv("VISION_BREAKER_FAILURE_RATE", "0.5")
+    )
+    vision_breaker_min_calls: int = int(os.getenv("VISION_BREAKER_MIN_CALLS", "10"))
+    vision_breaker_window_s: float = float(
+        os.getenv("VISION_BREAKER_WINDOW_S", "60")
+    )
+    vision_breaker_open_s: float = float(os.getenv("VISION_BREAKER_OPEN_S", "30"))
+    vision_breaker_half_open_probes: int = int(
+        os.getenv("VISION_BREAKER_HALF_OPEN_PROBES", "1")
+    )
+
+    # Admission control for vision calls: "memory", "postgres" or "off"
+    admission_mode: str = os.getenv("ADMISSION_MODE", "memory")
+    # Global budget; each call reserves tokens_per_scan and settles actual usage
+    openai_tokens_per_minute: int = int(
+        os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000")
+    )
+    admission_max_concurrent_per_user: int = int(
+        os.getenv("ADMISSION_MAX_CONCURRENT_PER_USER", "3")
+    )
+    admission_max_wait_s: float = float(os.getenv("ADMISSION_MAX_WAIT_S", "10"))
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+    admission_lease_ttl_s: int = int(os.getenv("ADMISSION_LEASE_TTL_S", "180"))
+
+    # Upload normalization before vision analysis and S3 storage
+    image_max_edge_px: int = int(os.getenv("IMAGE_MAX_EDGE_PX", "1536"))
+    image_output_format: str = os.getenv("IMAGE_OUTPUT_FORMAT", "jpeg")  # or "webp"
+    image_quality: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    # "high", "low", or "auto" (low when the long edge <= vision_low_detail_max_edge)
+    vision_detail: str = os.getenv("VISION_DETAIL", "high")
+    vision_low_detail_max_edge: int = int(
+        os.getenv("VISION_LOW_DETAIL_MAX_EDGE", "512")
+    )
+
+    # USDA lookups run concurrently per scan; cap fan-out and bound each item
+    usda_max_concurrency: int = int(os.getenv("USDA_MAX_CONCURRENCY", "8"))
+    usda_item_timeout_s: float = float(os.getenv("USDA_ITEM_TIMEOUT_S", "4.0"))
+
+    # Shared USDA HTTP client (connection pool reused across requests)
+    usda_http2: bool = os.getenv("USDA_HTTP2", "true").lower() == "true"
+    usda_request_timeout_s: float = float(os.getenv("USDA_REQUEST_TIMEOUT_S", "5.0"))
+    usda_max_connections: int = int(os.getenv("USDA_MAX_CONNECTIONS", "20"))
+    usda_max_keepalive_connections: int = int(
+        os.getenv("USDA_MAX_KEEPALIVE_CONNECTIONS", "10")
+    )
+    usda_keepalive_expiry_s: float = float(os.getenv("USDA_KEEPALIVE_EXPIRY_S", "30"))
+    usda_api_base_url: str = os.getenv(
+        "USDA_API_BASE_URL", "https://api.nal.usda.gov/fdc/v1"
+    ).rstrip("/")
+
+    # Offline USDA FoodData Central database (see import_usda_foods.py);
+    # the remote search API is only used as a fallback when enabled
+    local_nutrition_db_path: str = os.getenv(
+        "LOCAL_NUTRITION_DB_PATH", "data/usda_foods.sqlite"
+    )
+    usda_remote_fallback: bool = (
+        os.getenv("USDA_REMOTE_FALLBACK", "true").lower() == "true"
+    )
+
+    # Food name normalization rules (default: app/data/food_normalization.json)
+    food_normalization_path: str = os.getenv("FOOD_NORMALIZATION_PATH", "")
+    # Minimum weighted token overlap for a fuzzy rule match (0-1)
+    food_match_threshold: float = float(os.getenv("FOOD_MATCH_THRESHOLD", "0.75"))
+    # Minimum trigram similarity to correct a misspelled token (0-1)
+    food_token_match_threshold: float = float(
+        os.getenv("FOOD_TOKEN_MATCH_THRESHOLD", "0.6")
+    )
+    # Portion categories and their keywords (default: app/data/food_categories.json)
+    food_categories_path: str = os.getenv("FOOD_CATEGORIES_PATH", "")
+
+    # Presigned S3 URLs are dated at the start of a fixed signing window so a
+    # key keeps the same URL for the whole window; cached per object key
+    presign_expires_s: int = int(os.getenv("PRESIGN_EXPIRES_S", "3600"))
+    presign_window_s: int = int(os.getenv("PRESIGN_WINDOW_S", "900"))
+    presign_cache_max_entries: int = int(
+        os.getenv("PRESIGN_CACHE_MAX_ENTRIES", "10000")
+    )
+
+    # In-process nutrition cache in front of USDA lookups
+    nutrition_cache_max_entries: int = int(
+        os.getenv("NUTRITION_CACHE_MAX_ENTRIES", "5000")
+    )
+    nutrition_cache_ttl_s: float = float(
+        os.getenv("NUTRITION_CACHE_TTL_S", str(7 * 24 * 3600))
+    )
+    nutrition_cache_negative_ttl_s: float = float(
+        os.getenv("NUTRITION_CACHE_NEGATIVE_TTL_S", "3600")
+    )
+
+    # Background warm-up of the nutrition cache from recent meal logs
+    nutrition_warmup_enabled: bool = (
+        os.getenv("NUTRITION_WARMUP_ENABLED", "true").lower() == "true"
+    )
+    nutrition_warmup_top_n: int = int(os.getenv("NUTRITION_WARMUP_TOP_N", "500"))
+    nutrition_warmup_lookback_days: int = int(
+        os.getenv("NUTRITION_WARMUP_LOOKBACK_DAYS", "30")
+    )
+    nutrition_warmup_batch_size: int = int(
+        os.getenv("NUTRITION_WARMUP_BATCH_SIZE", "50")
+    )
+
+    # Durable cache of vision results for resubmitted photos
+    scan_cache_enabled: bool = os.getenv("SCAN_CACHE_ENABLED", "true").lower() == "true"
+    scan_cache_ttl_s: int = int(os.getenv("SCAN_CACHE_TTL_S", str(30 * 24 * 3600)))
+    scan_cache_max_entries: int = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "50000"))
+    scan_cache_prune_interval: int = int(
+        os.getenv("SCAN_CACHE_PRUNE_INTERVAL", "100")
+    )  # Inserts between prunes
+
+    # POST /scan/batch limits
+    scan_batch_max_images: int = int(os.getenv("SCAN_BATCH_MAX_IMAGES", "5"))
+    scan_batch_concurrency: int = int(os.getenv("SCAN_BATCH_CONCURRENCY", "3"))
+
+    # Coalescing of identical in-flight scans: "off", "local" or "postgres".
+    # "postgres" (advisory locks across workers) is experimental: it is only
+    # covered by tests/test_single_flight.py when TEST_POSTGRES_URL is set
+    scan_coalesce_mode: str = os.getenv("SCAN_COALESCE_MODE", "local")
+    scan_coalesce_wait_s: float = float(os.getenv("SCAN_COALESCE_WAIT_S", "120"))
+    scan_coalesce_poll_s: float = float(os.getenv("SCAN_COALESCE_POLL_S", "0.25"))
+
+    # Asynchronous scan jobs (/scan/jobs), queued in Postgres
+    scan_job_workers: int = int(os.getenv("SCAN_JOB_WORKERS", "4"))
+    scan_job_max_queue_depth: int = int(os.getenv("SCAN_JOB_MAX_QUEUE_DEPTH", "200"))
+    scan_job_max_pending_per_user: int = int(
+        os.getenv("SCAN_JOB_MAX_PENDING_PER_USER", "3")
+    )
+    scan_job_poll_interval_s: float = float(
+        os.getenv("SCAN_JOB_POLL_INTERVAL_S", "1.0")
+    )
+    # Running jobs older than this are assumed orphaned by a crashed worker
+    scan_job_stale_after_s: int = int(os.getenv("SCAN_JOB_STALE_AFTER_S", "300"))
+    scan_job_max_attempts: int = int(os.getenv("SCAN_JOB_MAX_ATTEMPTS", "2"))
+
+    # GET /log pages: max page size, and the row cap when no limit is given
+    log_page_max_limit: int = int(os.getenv("LOG_PAGE_MAX_LIMIT", "100"))
+    log_unpaginated_max_rows: int = int(os.getenv("LOG_UNPAGINATED_MAX_ROWS", "500"))
+
+    # Admin endpoints are disabled unless ADMIN_API_KEY is set
+    admin_api_key: str = os.getenv("ADMIN_API_KEY", "")
+
     # Token pricing configuration
     # Base unit: 1 scan ≈ 3000 AI tokens (prompt + image + response)
     tokens_per_scan: int = 3000  # AI tokens consumed per scan
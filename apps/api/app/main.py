@@ -1,10 +1,17 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers.scan import router as scan_router
 from app.routers.log import router as log_router
 from app.routers.auth import router as auth_router
 from app.routers.feedback import router as feedback_router
+from app.routers.admin import router as admin_router
 from app.services.storage import ensure_bucket
+from app.services.http_client import get_usda_client, close_usda_client
+from app.services.scan_jobs import scan_job_pool
+from app.services.llm_client import warm_vision_model, close_vision_model
+from app.services.nutrition_warmup import warm_nutrition_cache
+from app.config import settings
 from app.db import init_db
 
 app = FastAPI(
@@ -27,6 +34,7 @@ app.include_router(auth_router)
 app.include_router(scan_router)
 app.include_router(log_router)
 app.include_router(feedback_router)
+app.include_router(admin_router)
 
 
 @app.get("/health")
@@ -38,3 +46,26 @@ def health():
 def startup():
     ensure_bucket()
     init_db()
+    get_usda_client()
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    scan_job_pool.start(settings.scan_job_workers)
+    # Open OpenAI connections in the background; startup does not wait
+    app.state.warmup_task = asyncio.create_task(warm_vision_model())
+    # Prefetch nutrition of frequently logged foods; neither startup nor
+    # /health waits for it
+    app.state.nutrition_warmup_task = asyncio.create_task(warm_nutrition_cache())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Stop both warm-ups before the clients they use are closed
+    warmups = [app.state.warmup_task, app.state.nutrition_warmup_task]
+    for task in warmups:
+        task.cancel()
+    await asyncio.gather(*warmups, return_exceptions=True)
+    await scan_job_pool.stop()
+    await close_usda_client()
+    await close_vision_model()
@@ -8,6 +8,9 @@ from sqlalchemy import (
     JSON,
     ForeignKey,
     Boolean,
+    Index,
+    LargeBinary,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
@@ -41,6 +44,10 @@ class User(Base):
 
 class MealLog(Base):
     __tablename__ = "meal_logs"
+    __table_args__ = (
+        # Keyset pagination of GET /log: user's logs by (created_at, id)
+        Index("ix_meal_logs_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -49,6 +56,8 @@ class MealLog(Base):
     photo_url = Column(String, nullable=True)
     items = Column(JSON, nullable=True)
     plate_size_cm = Column(Float, nullable=True)
+    # Image content hash (see scan_cache_key); used to coalesce duplicate scans
+    content_hash = Column(String(64), nullable=True, index=True)
 
     # Relationship
     user = relationship("User", back_populates="meal_logs")
@@ -99,3 +108,80 @@ class UserFeedback(Base):
 
     # Relationship
     user = relationship("User")
+
+
+class ScanResultCache(Base):
+    """Vision model output keyed by image content hash, plate size, model and detail."""
+
+    __tablename__ = "scan_result_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    model_name = Column(String, nullable=False)
+    result = Column(JSON, nullable=False)  # Parsed {"foods": [...], "meal_notes"}
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class ScanJob(Base):
+    """Queued /scan/jobs request; claimed by workers with FOR UPDATE SKIP LOCKED."""
+
+    __tablename__ = "scan_jobs"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_scan_jobs_user_key"),
+    )
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned to clients
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    idempotency_key = Column(String, nullable=True)
+    status = Column(
+        String, nullable=False, default="queued", index=True
+    )  # queued | running | succeeded | failed
+    image_data = Column(LargeBinary, nullable=True)  # Cleared once finished
+    content_type = Column(String, nullable=False, default="image/jpeg")
+    detail = Column(String, nullable=False, default="high")
+    plate_size_cm = Column(Float, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)  # ScanResponse on success
+    error = Column(Text, nullable=True)
+    error_status = Column(Integer, nullable=True)  # HTTP status of the failure
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Not claimed before this time; set when a job is re-queued on overload
+    run_after = Column(DateTime, nullable=True)
+
+    # Relationship
+    user = relationship("User")
+
+
+class AdmissionBucket(Base):
+    """Token bucket shared by all workers when ADMISSION_MODE=postgres."""
+
+    __tablename__ = "admission_buckets"
+
+    name = Column(String(64), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class AdmissionLease(Base):
+    """A user's in-flight vision call, counted against the per-user limit."""
+
+    __tablename__ = "admission_leases"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)  # Reclaimed after a crash
+
+
+class FdcFoodIndex(Base):
+    """Normalized food name -> the FoodData Central food chosen for it."""
+
+    __tablename__ = "fdc_food_index"
+
+    normalized_name = Column(String, primary_key=True)
+    fdc_id = Column(Integer, nullable=False)
+    description = Column(String, nullable=True)  # USDA description when chosen
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
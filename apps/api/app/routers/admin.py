@@ -0,0 +1,96 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.config import settings
+from app.services.admission import vision_admission
+from app.services.http_client import usda_pool_stats
+from app.services.image_processing import normalize_stats
+from app.services.nutrition import nutrition_cache
+from app.services.nutrition_warmup import warmup_stats
+from app.services.url_helper import presign_cache, presign_cache_stats
+from app.services.vision_parser import parse_stats
+from app.services.vision_resilience import vision_resilience_stats
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def require_admin(x_admin_key: str | None = Header(None)):
+    """Dependency guarding operational endpoints with the ADMIN_API_KEY header."""
+    if not settings.admin_api_key:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not found",
+        )
+    if not x_admin_key or not hmac.compare_digest(
+        x_admin_key, settings.admin_api_key
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key",
+        )
+
+
+@router.get("/usda-pool", dependencies=[Depends(require_admin)])
+def get_usda_pool_stats():
+    """Connection pool usage of the shared USDA HTTP client."""
+    return usda_pool_stats()
+
+
+@router.get("/nutrition-cache", dependencies=[Depends(require_admin)])
+def get_nutrition_cache(include_keys: bool = False):
+    """Nutrition cache counters, optionally with the cached food names."""
+    stats = nutrition_cache.stats()
+    if include_keys:
+        stats["keys"] = nutrition_cache.keys()
+    return stats
+
+
+@router.delete("/nutrition-cache", dependencies=[Depends(require_admin)])
+def flush_nutrition_cache(key: str | None = None):
+    """Flush the whole nutrition cache, or a single normalized food name."""
+    if key is not None:
+        return {"status": "ok", "removed": int(nutrition_cache.delete(key))}
+    return {"status": "ok", "removed": nutrition_cache.clear()}
+
+
+@router.get("/nutrition-warmup", dependencies=[Depends(require_admin)])
+def get_nutrition_warmup():
+    """Progress and duration of the startup nutrition cache warm-up."""
+    return warmup_stats()
+
+
+@router.get("/presign-cache", dependencies=[Depends(require_admin)])
+def get_presign_cache():
+    """Presigned URL cache counters and the current signing window."""
+    return presign_cache_stats()
+
+
+@router.delete("/presign-cache", dependencies=[Depends(require_admin)])
+def flush_presign_cache():
+    """Flush cached presigned URLs (e.g. after rotating S3 credentials)."""
+    return {"status": "ok", "removed": presign_cache.clear()}
+
+
+@router.get("/image-stats", dependencies=[Depends(require_admin)])
+def get_image_stats():
+    """Bytes in/out and encode time of normalized scan uploads."""
+    return normalize_stats()
+
+
+@router.get("/vision-parse-stats", dependencies=[Depends(require_admin)])
+def get_vision_parse_stats():
+    """Per-model counts of unparseable and salvaged vision responses."""
+    return parse_stats()
+
+
+@router.get("/vision-resilience", dependencies=[Depends(require_admin)])
+def get_vision_resilience():
+    """Hedged vision requests, recent latency percentiles and breaker state."""
+    return vision_resilience_stats()
+
+
+@router.get("/admission", dependencies=[Depends(require_admin)])
+async def get_admission_stats():
+    """Vision admission control: token budget, queue and rejections."""
+    return await vision_admission.stats()
@@ -1,9 +1,14 @@
-from app.services.url_helper import get_s3_url
-from fastapi import APIRouter, Depends
-from typing import Optional
-from datetime import datetime
+import base64
+import binascii
+
+from app.services.url_helper import get_s3_url, get_s3_urls
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import sqlalchemy as sa
 from sqlalchemy.orm import Session
 
+from app.config import settings
 from app.schemas import LogRequest
 from app.db import get_db
 from app.models import MealLog, User
@@ -40,38 +45,165 @@ async def create_log(
     return {"status": "ok", "id": log.id}
 
 
+def encode_cursor(row) -> str:
+    """Opaque position after row in (created_at, id) descending order."""
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, log_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def parse_date_param(name: str, value: str) -> datetime:
+    """ISO date or datetime, as naive UTC like MealLog.created_at."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name}: expected an ISO date or datetime",
+        )
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+# Fields of a serialized meal log, in response order, and their columns
+LOG_COLUMNS = {
+    "id": MealLog.id,
+    "items": MealLog.items,
+    "total_calories": MealLog.total_calories,
+    "photo_url": MealLog.photo_url,
+    "plate_size_cm": MealLog.plate_size_cm,
+    "created_at": MealLog.created_at,
+}
+LOG_FIELDS = tuple(LOG_COLUMNS)
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Comma-separated field names to serialize (all when omitted). id and
+    created_at are always included: the cursor is built from them.
+    """
+    if not fields:
+        return LOG_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(LOG_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}; "
+            f"expected any of {', '.join(LOG_FIELDS)}",
+        )
+    requested |= {"id", "created_at"}
+    return tuple(name for name in LOG_FIELDS if name in requested)
+
+
+def serialize_log(
+    row, photo_url: Optional[str] = None, fields: Tuple[str, ...] = LOG_FIELDS
+) -> dict:
+    """
+    row: a MealLog, or a projected row holding at least the given fields.
+    photo_url: the row's already presigned photo URL, if at hand.
+    """
+    data = {}
+    for name in fields:
+        value = getattr(row, name)
+        if name == "items":
+            value = value or []
+        elif name == "photo_url":
+            value = photo_url or get_s3_url(value)
+        elif name == "created_at":
+            value = value.isoformat()
+        data[name] = value
+    return data
+
+
 @router.get("")
 async def get_log(
     date: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    # Filter by current user
-    query = (
-        db.query(MealLog)
-        .filter(MealLog.user_id == current_user.id)
-        .order_by(MealLog.created_at.desc())
+    """
+    Meal logs, newest first, keyset-paginated on (created_at, id).
+    Pass limit (at most LOG_PAGE_MAX_LIMIT) and then the returned
+    next_cursor to fetch the following page; next_cursor is null on the
+    last page. Without limit, up to LOG_UNPAGINATED_MAX_ROWS rows are
+    returned. date (one day) or start_date/end_date (inclusive dates or
+    datetimes; not both kinds) narrow the range. fields (e.g.
+    "total_calories,photo_url") limits each log to those fields; only
+    their columns are read, so summary views skip the items JSON.
+    """
+    selected = parse_fields(fields)
+    if limit:
+        page_size = min(limit, settings.log_page_max_limit)
+    else:
+        page_size = settings.log_unpaginated_max_rows
+
+    # Plain column rows: no ORM instances or identity map for a list view
+    query = db.query(*(LOG_COLUMNS[name] for name in selected)).filter(
+        MealLog.user_id == current_user.id
     )
 
     if date:
+        if start_date or end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Pass either date or start_date/end_date, not both",
+            )
+        # Validated under its own name, then used as that whole day
+        parse_date_param("date", date)
         day = date[:10]
-        start = datetime.fromisoformat(day)
-        end = start.replace(hour=23, minute=59, second=59, microsecond=999999)
-        query = query.filter(MealLog.created_at >= start, MealLog.created_at <= end)
-
-    results = []
-    for row in query.all():
-        results.append(
-            {
-                "id": row.id,
-                "items": row.items or [],
-                "total_calories": row.total_calories,
-                "photo_url": get_s3_url(row.photo_url),
-                "plate_size_cm": row.plate_size_cm,
-                "created_at": row.created_at.isoformat(),
-            }
+        start_date, end_date = day, day
+    if start_date:
+        start = parse_date_param("start_date", start_date)
+        query = query.filter(MealLog.created_at >= start)
+    if end_date:
+        end = parse_date_param("end_date", end_date)
+        if len(end_date) <= 10:
+            # A bare date includes that whole day
+            query = query.filter(MealLog.created_at < end + timedelta(days=1))
+        else:
+            query = query.filter(MealLog.created_at <= end)
+    if cursor:
+        after_created_at, after_id = decode_cursor(cursor)
+        query = query.filter(
+            sa.tuple_(MealLog.created_at, MealLog.id) < (after_created_at, after_id)
         )
-    return {"items": results}
+
+    # One extra row tells whether another page follows
+    rows = (
+        query.order_by(MealLog.created_at.desc(), MealLog.id.desc())
+        .limit(page_size + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    rows = rows[:page_size]
+    if "photo_url" in selected:
+        photo_urls = get_s3_urls(row.photo_url for row in rows)
+    else:
+        photo_urls = [None] * len(rows)
+    return {
+        "items": [
+            serialize_log(row, url, selected) for row, url in zip(rows, photo_urls)
+        ],
+        "next_cursor": next_cursor,
+    }
 
 
 @router.get("/summary")
@@ -80,9 +212,6 @@ async def get_log_summary(
     current_user: User = Depends(get_current_user),
 ):
     """Get daily calorie totals for the last 7 days."""
-    from datetime import timedelta
-    import sqlalchemy as sa
-
     # Calculate date range
     now = datetime.utcnow()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -149,14 +278,7 @@ async def get_meal_log(
     )
     if not log:
         return {"error": "Log not found"}, 404
-    return {
-        "id": log.id,
-        "items": log.items or [],
-        "total_calories": log.total_calories,
-        "photo_url": get_s3_url(log.photo_url),
-        "plate_size_cm": log.plate_size_cm,
-        "created_at": log.created_at.isoformat(),
-    }
+    return serialize_log(log)
 
 
 @router.delete("/all")
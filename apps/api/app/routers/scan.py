@@ -1,18 +1,59 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, status
-import uuid
-from app.schemas import ScanResponse
-from app.services.vision import analyze_plate
-from app.db import get_db
-from app.models import MealLog, User
+from fastapi import (
+    APIRouter,
+    UploadFile,
+    File,
+    Form,
+    Depends,
+    Header,
+    HTTPException,
+    status,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+from typing import List
+from app.schemas import ScanResponse, ScanJobResponse, ScanBatchResponse
+from app.config import settings
+from app.db import get_db, SessionLocal
+from app.models import User
 from sqlalchemy.orm import Session
-from app.services.storage import upload_image
-from app.services.url_helper import get_s3_url
-from datetime import datetime
+from app.services.image_processing import normalize_image, InvalidImageError
+from app.services.scan_pipeline import (
+    run_scan,
+    run_scan_batch,
+    INSUFFICIENT_SCANS_DETAIL,
+)
+from app.services.scan_jobs import (
+    ScanQueueFullError,
+    enqueue_scan_job,
+    get_scan_job,
+    serialize_scan_job,
+)
 from app.routers.auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/scan", tags=["scan"])
 
 
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def read_normalized_image(image: UploadFile):
+    """Validate, rotate, downscale and re-encode the upload off the event loop."""
+    raw_bytes = await image.read()
+    try:
+        return await run_in_threadpool(normalize_image, raw_bytes)
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @router.post("", response_model=ScanResponse)
 async def scan_plate(
     image: UploadFile = File(...),
@@ -26,41 +67,192 @@ async def scan_plate(
     if current_user.scans_remaining <= 0:
         raise HTTPException(
             status_code=status.HTTP_402_PAYMENT_REQUIRED,
-            detail="Insufficient scans available. Please wait for your daily reset or purchase more scans to continue.",
+            detail=INSUFFICIENT_SCANS_DETAIL,
         )
 
-    # Process the image
-    image_bytes = await image.read()
+    normalized = await read_normalized_image(image)
 
-    # Analyze plate
-    items = await analyze_plate(
-        image_bytes, plate_size_cm=plate_size_cm, user_id=current_user.id, db=db
+    return await run_scan(
+        db,
+        current_user,
+        normalized.data,
+        content_type=normalized.content_type,
+        detail=normalized.detail,
+        plate_size_cm=plate_size_cm,
     )
 
-    total_calories = sum(i.calories or 0 for i in items)
-    key = f"uploads/{uuid.uuid4().hex}.jpg"
-    photo_url = upload_image(key, image_bytes, image.content_type or "image/jpeg")
-
-    # Create MealLog entry immediately
-    log = MealLog(
-        user_id=current_user.id,
-        created_at=datetime.utcnow(),
-        total_calories=round(total_calories, -1),
-        photo_url=photo_url,
-        items=[item.model_dump() for item in items],
-        plate_size_cm=plate_size_cm,
+
+@router.post("/stream")
+async def scan_plate_stream(
+    image: UploadFile = File(...),
+    plate_size_cm: float | None = Form(None),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Same as POST /scan, streamed as Server-Sent Events:
+    accepted -> identified -> item (one per food, as nutrition resolves)
+    -> complete (the ScanResponse), or error.
+    """
+    if current_user.scans_remaining <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=INSUFFICIENT_SCANS_DETAIL,
+        )
+
+    normalized = await read_normalized_image(image)
+    user_id = current_user.id
+
+    async def events():
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_event(event: str, data: dict):
+            await queue.put((event, data))
+
+        async def run():
+            # Own session: request dependencies are torn down before streaming
+            db = SessionLocal()
+            try:
+                user = db.get(User, user_id)
+                response = await run_scan(
+                    db,
+                    user,
+                    normalized.data,
+                    content_type=normalized.content_type,
+                    detail=normalized.detail,
+                    plate_size_cm=plate_size_cm,
+                    on_event=on_event,
+                )
+                await queue.put(("complete", response.model_dump()))
+            except HTTPException as e:
+                await queue.put(
+                    ("error", {"status_code": e.status_code, "detail": e.detail})
+                )
+            except Exception:
+                logger.exception("Streaming scan failed")
+                await queue.put(
+                    ("error", {"status_code": 500, "detail": "Scan failed"})
+                )
+            finally:
+                db.close()
+
+        yield format_sse(
+            "accepted",
+            {
+                "bytes_in": normalized.bytes_in,
+                "bytes_out": normalized.bytes_out,
+                "detail": normalized.detail,
+            },
+        )
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, data = await queue.get()
+                yield format_sse(event, data)
+                if event in ("complete", "error"):
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    db.add(log)
 
-    # Successfully processed and analyzed, now decrement the scan balance
-    current_user.scans_remaining -= 1
-    db.commit()
-    db.refresh(log)
 
-    return ScanResponse(
-        items=items,
-        total_calories=total_calories,
-        photo_url=get_s3_url(photo_url),
+@router.post("/batch", response_model=ScanBatchResponse)
+async def scan_plate_batch(
+    images: List[UploadFile] = File(...),
+    plate_size_cm: float | None = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Scan several plate images in one request. Images are analyzed
+    concurrently; all meal logs and the scan decrement are saved together.
+    Each result carries its own status_code and error.
+    """
+    if len(images) > settings.scan_batch_max_images:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.scan_batch_max_images} images per batch",
+        )
+
+    # Credits for the whole batch are checked up front
+    if current_user.scans_remaining < len(images):
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=INSUFFICIENT_SCANS_DETAIL,
+        )
+
+    normalized = []
+    for image in images:
+        raw_bytes = await image.read()
+        try:
+            normalized.append(await run_in_threadpool(normalize_image, raw_bytes))
+        except InvalidImageError as e:
+            normalized.append(e)
+
+    results = await run_scan_batch(
+        db, current_user, normalized, plate_size_cm=plate_size_cm
+    )
+    return ScanBatchResponse(
+        results=results,
         scans_remaining=current_user.scans_remaining,
-        log_id=log.id,
     )
+
+
+@router.post(
+    "/jobs",
+    response_model=ScanJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_scan_job(
+    image: UploadFile = File(...),
+    plate_size_cm: float | None = Form(None),
+    idempotency_key: str | None = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Queue a plate scan and return its job id immediately. Poll GET /scan/jobs/{id}."""
+    if current_user.scans_remaining <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=INSUFFICIENT_SCANS_DETAIL,
+        )
+
+    normalized = await read_normalized_image(image)
+
+    try:
+        job = enqueue_scan_job(
+            db,
+            current_user,
+            normalized,
+            plate_size_cm=plate_size_cm,
+            idempotency_key=idempotency_key,
+        )
+    except ScanQueueFullError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    return serialize_scan_job(db, job)
+
+
+@router.get("/jobs/{job_id}", response_model=ScanJobResponse)
+def get_scan_job_status(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Status of a queued scan; includes the ScanResponse once it has succeeded."""
+    job = get_scan_job(db, current_user.id, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan job not found",
+        )
+    return serialize_scan_job(db, job)
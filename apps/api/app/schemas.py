@@ -100,6 +100,8 @@ class FoodItem(BaseModel):
     name: str
     normalized_name: Optional[str] = None
     portion: Optional[str] = None
+    # Kept so stored items can be recomputed (see recompute_meal_logs.py)
+    cooking_style: Optional[str] = None
     estimated_grams: Optional[float] = None
     calories: Optional[float] = None
     confidence: Optional[float] = None
@@ -109,12 +111,52 @@ class FoodItem(BaseModel):
     fat_g: Optional[float] = None
 
 
+class VisionFood(BaseModel):
+    """One food entry as returned by the vision model."""
+
+    name: str = "Unknown"
+    portion: Optional[str] = None
+    cooking_style: Optional[str] = None
+    confidence: Optional[float] = None
+    notes: Optional[str] = None
+
+
+class VisionAnalysis(BaseModel):
+    """Validated vision model output: {"foods": [...], "meal_notes": ...}."""
+
+    foods: List[VisionFood] = []
+    meal_notes: Optional[str] = None
+
+
 class ScanResponse(BaseModel):
     items: List[FoodItem]
     total_calories: Optional[float] = None
     photo_url: Optional[str] = None
     scans_remaining: Optional[int] = None
     log_id: Optional[int] = None
+    cached: bool = False  # True when the vision result came from the scan cache
+    coalesced: bool = False  # True when attached to an identical in-flight scan
+
+
+class ScanBatchItem(BaseModel):
+    index: int  # Position of the image in the request
+    status_code: int
+    result: Optional[ScanResponse] = None
+    error: Optional[str] = None
+
+
+class ScanBatchResponse(BaseModel):
+    results: List[ScanBatchItem]
+    scans_remaining: int
+
+
+class ScanJobResponse(BaseModel):
+    id: str
+    status: str  # queued | running | succeeded | failed
+    created_at: str
+    finished_at: Optional[str] = None
+    result: Optional[ScanResponse] = None
+    error: Optional[str] = None
 
 
 class LogRequest(BaseModel):
@@ -0,0 +1,409 @@
+"""
+Admission control in front of the vision model.
+
+A global token bucket holds OPENAI_TOKENS_PER_MINUTE and each vision call
+takes the tokens_per_scan estimate from it, so bursts queue here instead
+of tripping OpenAI's rate limit. Each user may also have at most
+ADMISSION_MAX_CONCURRENT_PER_USER calls in flight. Waiting calls are
+served round-robin across users, and a call that could not be admitted
+within ADMISSION_MAX_WAIT_S is rejected at once with a Retry-After hint.
+
+ADMISSION_MODE picks "memory" (per process), "postgres" (bucket and
+per-user leases shared by every worker through the database) or "off".
+"""
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import AdmissionBucket, AdmissionLease, User
+from app.services.vision_resilience import latencies
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_BUCKET = "vision"
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a vision call cannot be admitted; carries the HTTP status."""
+
+    def __init__(self, detail: str, status_code: int, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Handed to an admitted call; set used_tokens to settle the estimate."""
+
+    def __init__(self, cost: int):
+        self.cost = cost
+        self.used_tokens: Optional[int] = None
+        # Attempts cancelled after being sent (losing hedges) are billed but
+        # their usage is never reported; they are charged at the estimate
+        self.abandoned_tokens = 0
+
+    def abandon(self, attempts: int):
+        self.abandoned_tokens += attempts * settings.tokens_per_scan
+
+
+def _capacity() -> float:
+    return float(settings.openai_tokens_per_minute)
+
+
+def _refill_rate() -> float:
+    """Tokens per second."""
+    return settings.openai_tokens_per_minute / 60.0
+
+
+class MemoryTokenBucket:
+    def __init__(self):
+        self._tokens = _capacity()
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            _capacity(), self._tokens + (now - self._updated) * _refill_rate()
+        )
+        self._updated = now
+
+    async def try_take(self, cost: float) -> float:
+        """Takes cost tokens and returns 0, or returns the seconds to wait."""
+        self._refill()
+        if self._tokens >= cost:
+            self._tokens -= cost
+            return 0.0
+        return (cost - self._tokens) / _refill_rate()
+
+    async def adjust(self, delta: float):
+        self._refill()
+        self._tokens = min(_capacity(), self._tokens + delta)
+
+    async def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class DatabaseTokenBucket:
+    """
+    The same bucket stored in an admission_buckets row. Each operation
+    locks the row (SELECT ... FOR UPDATE), refills it from the elapsed
+    time and commits, so every worker draws from one budget.
+    """
+
+    def _locked_bucket(self, db) -> AdmissionBucket:
+        bucket = (
+            db.query(AdmissionBucket)
+            .filter(AdmissionBucket.name == GLOBAL_BUCKET)
+            .with_for_update()
+            .first()
+        )
+        if bucket is None:
+            db.add(
+                AdmissionBucket(
+                    name=GLOBAL_BUCKET,
+                    tokens=_capacity(),
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # Another worker created it first
+            return self._locked_bucket(db)
+
+        now = datetime.utcnow()
+        elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+        bucket.tokens = min(_capacity(), bucket.tokens + elapsed * _refill_rate())
+        bucket.updated_at = now
+        return bucket
+
+    def _try_take(self, cost: float) -> float:
+        db = SessionLocal()
+        try:
+            bucket = self._locked_bucket(db)
+            wait = 0.0
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+            else:
+                wait = (cost - bucket.tokens) / _refill_rate()
+            db.commit()
+            return wait
+        finally:
+            db.close()
+
+    def _adjust(self, delta: float):
+        db = SessionLocal()
+        try:
+            bucket = self._locked_bucket(db)
+            bucket.tokens = min(_capacity(), bucket.tokens + delta)
+            db.commit()
+        finally:
+            db.close()
+
+    def _available(self) -> float:
+        db = SessionLocal()
+        try:
+            tokens = self._locked_bucket(db).tokens
+            db.rollback()
+            return tokens
+        finally:
+            db.close()
+
+    async def try_take(self, cost: float) -> float:
+        return await run_in_threadpool(self._try_take, cost)
+
+    async def adjust(self, delta: float):
+        await run_in_threadpool(self._adjust, delta)
+
+    async def available(self) -> float:
+        return await run_in_threadpool(self._available)
+
+
+class MemoryUserSlots:
+    def __init__(self):
+        self._active: Counter = Counter()
+
+    async def acquire(self, user_id: int) -> Optional[int]:
+        if self._active[user_id] >= settings.admission_max_concurrent_per_user:
+            return None
+        self._active[user_id] += 1
+        return user_id
+
+    async def release(self, lease: int):
+        self._active[lease] -= 1
+        if self._active[lease] <= 0:
+            del self._active[lease]
+
+    def active(self) -> int:
+        return sum(self._active.values())
+
+
+class DatabaseUserSlots:
+    """
+    Per-user limit counted as admission_leases rows. The user row is
+    locked while counting, so concurrent acquires from different workers
+    cannot both take the last slot. Leases of crashed workers expire
+    after ADMISSION_LEASE_TTL_S.
+    """
+
+    def _acquire(self, user_id: int) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            db.query(User.id).filter(User.id == user_id).with_for_update().first()
+            db.query(AdmissionLease).filter(
+                AdmissionLease.user_id == user_id, AdmissionLease.expires_at <= now
+            ).delete(synchronize_session=False)
+            active = (
+                db.query(AdmissionLease)
+                .filter(AdmissionLease.user_id == user_id)
+                .count()
+            )
+            if active >= settings.admission_max_concurrent_per_user:
+                db.commit()
+                return None
+
+            lease_id = uuid.uuid4().hex
+            db.add(
+                AdmissionLease(
+                    id=lease_id,
+                    user_id=user_id,
+                    expires_at=now + timedelta(seconds=settings.admission_lease_ttl_s),
+                )
+            )
+            db.commit()
+            return lease_id
+        finally:
+            db.close()
+
+    def _release(self, lease_id: str):
+        db = SessionLocal()
+        try:
+            db.query(AdmissionLease).filter(AdmissionLease.id == lease_id).delete(
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    async def acquire(self, user_id: int) -> Optional[str]:
+        return await run_in_threadpool(self._acquire, user_id)
+
+    async def release(self, lease: str):
+        try:
+            await run_in_threadpool(self._release, lease)
+        except Exception as e:
+            # The lease expires on its own; don't fail the scan over it
+            logger.warning(f"Could not release admission lease {lease}: {e}")
+
+
+class AdmissionController:
+    def __init__(self, mode: str):
+        self.mode = mode
+        if mode == "postgres":
+            self.bucket = DatabaseTokenBucket()
+            self.slots = DatabaseUserSlots()
+        else:
+            self.bucket = MemoryTokenBucket()
+            self.slots = MemoryUserSlots()
+        # user_id -> that user's waiters, in round-robin order
+        self._queues: "OrderedDict[Optional[int], Deque[asyncio.Event]]" = (
+            OrderedDict()
+        )
+        self._queued = 0
+        self.counts: Counter = Counter()
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[int]) -> AsyncIterator[AdmissionTicket]:
+        """
+        Holds a per-user slot and the global token estimate for the body.
+        Raises AdmissionRejectedError: 429 when the user is at their
+        concurrency limit, 503 when the global budget is saturated.
+        """
+        if self.mode not in ("memory", "postgres"):
+            yield AdmissionTicket(0)
+            return
+
+        lease = None
+        if user_id is not None:
+            lease = await self.slots.acquire(user_id)
+            if lease is None:
+                self.counts["rejected_user_limit"] += 1
+                raise AdmissionRejectedError(
+                    "Too many scans in progress. Please wait for them to finish.",
+                    status.HTTP_429_TOO_MANY_REQUESTS,
+                    retry_after=max(1, math.ceil(latencies.percentile(50) or 1)),
+                )
+        try:
+            ticket = AdmissionTicket(settings.tokens_per_scan)
+            await self._take_tokens(user_id, ticket.cost)
+            self.counts["admitted"] += 1
+            try:
+                yield ticket
+            except Exception:
+                if ticket.used_tokens is None:
+                    # Failed before any usage was reported (breaker open,
+                    # connection error, rate limited): nothing was spent
+                    ticket.used_tokens = 0
+                raise
+            finally:
+                if ticket.used_tokens is not None:
+                    # Settle the estimate against the reported usage
+                    charged = ticket.used_tokens + ticket.abandoned_tokens
+                    if charged != ticket.cost:
+                        await self.bucket.adjust(ticket.cost - charged)
+        finally:
+            if lease is not None:
+                await self.slots.release(lease)
+
+    async def reserve_hedge(self, ticket: AdmissionTicket) -> bool:
+        """
+        Takes another tokens_per_scan for a hedged attempt of an admitted
+        call. Never waits: False (no hedge) when the budget cannot cover it
+        right now or other calls are queued for it.
+        """
+        if self.mode not in ("memory", "postgres"):
+            return True
+        if self._queued or await self.bucket.try_take(settings.tokens_per_scan) != 0:
+            self.counts["hedges_denied"] += 1
+            return False
+        ticket.cost += settings.tokens_per_scan
+        return True
+
+    def _saturated(self, wait_s: float) -> AdmissionRejectedError:
+        self.counts["rejected_saturated"] += 1
+        return AdmissionRejectedError(
+            "Scanning is busy right now. Please try again shortly.",
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            retry_after=max(1, math.ceil(wait_s)),
+        )
+
+    async def _take_tokens(self, user_id: Optional[int], cost: int):
+        if not self._queued and await self.bucket.try_take(cost) == 0:
+            return
+
+        # Everyone queued ahead is served first; reject now if that
+        # cannot happen within ADMISSION_MAX_WAIT_S
+        needed = cost * (self._queued + 1) - await self.bucket.available()
+        estimated_wait = max(0.0, needed) / _refill_rate()
+        if (
+            self._queued >= settings.admission_max_queue
+            or estimated_wait > settings.admission_max_wait_s
+        ):
+            raise self._saturated(estimated_wait)
+
+        waiter = asyncio.Event()
+        self._queues.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        self.counts["queued"] += 1
+        granted = False
+        deadline = time.monotonic() + settings.admission_max_wait_s
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._saturated(estimated_wait)
+                if not self._is_head(waiter):
+                    waiter.clear()
+                    try:
+                        await asyncio.wait_for(waiter.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                wait = await self.bucket.try_take(cost)
+                if wait == 0:
+                    granted = True
+                    return
+                await asyncio.sleep(min(wait, remaining))
+        finally:
+            self._dequeue(user_id, waiter, granted)
+
+    def _is_head(self, waiter: asyncio.Event) -> bool:
+        if not self._queues:
+            return False
+        return next(iter(self._queues.values()))[0] is waiter
+
+    def _dequeue(self, user_id: Optional[int], waiter: asyncio.Event, granted: bool):
+        queue = self._queues[user_id]
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._queues[user_id]
+        elif granted:
+            # Round-robin: this user's next call goes behind other users
+            self._queues.move_to_end(user_id)
+        if self._queues:
+            next(iter(self._queues.values()))[0].set()
+
+    async def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "capacity_tokens": _capacity(),
+            "available_tokens": round(await self.bucket.available(), 1),
+            "tokens_per_scan": settings.tokens_per_scan,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "admitted": self.counts["admitted"],
+            "queued_total": self.counts["queued"],
+            "rejected_user_limit": self.counts["rejected_user_limit"],
+            "rejected_saturated": self.counts["rejected_saturated"],
+            "hedges_denied": self.counts["hedges_denied"],
+        }
+
+
+vision_admission = AdmissionController(settings.admission_mode)
@@ -0,0 +1,87 @@
+"""
+Persistent normalized food name -> FDC ID index.
+
+The USDA search API is only needed to choose a food for a name
+(select_best_food_match); once chosen, the FDC ID is stored here so later
+lookups fetch that same food's nutrients directly. This keeps the
+name -> food choice stable across processes and restarts.
+
+The index is an optimization: if the database is unavailable, lookups
+behave as misses and saves are skipped.
+"""
+
+import logging
+from typing import Dict, Iterable, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.db import SessionLocal
+from app.models import FdcFoodIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _lookup(names: Iterable[str]) -> Dict[str, int]:
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(FdcFoodIndex.normalized_name, FdcFoodIndex.fdc_id)
+            .filter(FdcFoodIndex.normalized_name.in_(list(names)))
+            .all()
+        )
+        return {name: fdc_id for name, fdc_id in rows}
+    finally:
+        db.close()
+
+
+def _save(entries: Dict[str, Tuple[int, str]]):
+    db = SessionLocal()
+    try:
+        for name, (fdc_id, description) in entries.items():
+            # merge: another worker may have indexed the same name meanwhile
+            db.merge(
+                FdcFoodIndex(
+                    normalized_name=name, fdc_id=fdc_id, description=description
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _forget(names: Iterable[str]):
+    db = SessionLocal()
+    try:
+        db.query(FdcFoodIndex).filter(
+            FdcFoodIndex.normalized_name.in_(list(names))
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def lookup_fdc_ids(names: Iterable[str]) -> Dict[str, int]:
+    """Indexed FDC IDs of the given normalized names (misses are absent)."""
+    try:
+        return await run_in_threadpool(_lookup, names)
+    except Exception as e:
+        logger.warning(f"FDC index lookup failed: {e}")
+        return {}
+
+
+async def save_fdc_ids(entries: Dict[str, Tuple[int, str]]):
+    """Stores {normalized name: (fdc_id, description)}."""
+    if not entries:
+        return
+    try:
+        await run_in_threadpool(_save, entries)
+    except Exception as e:
+        logger.warning(f"FDC index save failed: {e}")
+
+
+async def forget_fdc_ids(names: Iterable[str]):
+    """Drops entries whose food USDA no longer serves, so they are re-chosen."""
+    try:
+        await run_in_threadpool(_forget, names)
+    except Exception as e:
+        logger.warning(f"FDC index delete failed: {e}")
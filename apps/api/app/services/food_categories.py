@@ -0,0 +1,134 @@
+"""
+Keyword-based portion categories for food names.
+
+Categories, their keywords and per-unit gram weights are loaded from a JSON
+file (FOOD_CATEGORIES_PATH, default app/data/food_categories.json). All
+keywords are compiled into one Aho-Corasick automaton, so a name is scanned
+once no matter how many categories or keywords the table holds.
+
+Keywords match anywhere in the lowercased name ("rice" matches "fried
+rice"). When several match, the winner is decided by, in order:
+
+1. the category's "priority" (higher wins, default 0),
+2. the longer keyword ("rice pudding" beats "rice"),
+3. the match starting further left,
+4. the category listed first in the file.
+"""
+
+import json
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+DEFAULT_CATEGORIES_PATH = Path(__file__).resolve().parent.parent / "data" / (
+    "food_categories.json"
+)
+
+# (priority, keyword length, -category order) of a keyword's winning category
+_Rank = Tuple[int, int, int]
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase keywords. Each state keeps the
+    best-ranked keyword ending there, its own or via the failure links, so a
+    scan only compares one candidate per character.
+    """
+
+    def __init__(self, keywords: Dict[str, Tuple[_Rank, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Best (rank, value) of the keywords ending at each state
+        self._best: List[Optional[Tuple[_Rank, str]]] = [None]
+
+        for keyword, output in keywords.items():
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._best.append(None)
+                state = next_state
+            self._best[state] = output
+
+        # Breadth-first, so a state's failure target is finished before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (
+                    self._best[child] is None or inherited[0] > self._best[child][0]
+                ):
+                    self._best[child] = inherited
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def best_match(self, text: str) -> Optional[str]:
+        """Value of the best-ranked keyword occurring in text, if any."""
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        winner: Optional[Tuple[Tuple[int, int, int, int], str]] = None
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found = best[state]
+            if found is None:
+                continue
+            (priority, length, order), value = found
+            # Earlier start wins among equal priority and length
+            rank = (priority, length, length - end, order)
+            if winner is None or rank > winner[0]:
+                winner = (rank, value)
+        return winner[1] if winner else None
+
+
+class FoodCategoryTable:
+    def __init__(self, categories: Dict[str, Dict]):
+        self.rules = dict(categories)
+        keywords: Dict[str, Tuple[_Rank, str]] = {}
+        for order, (category, config) in enumerate(self.rules.items()):
+            priority = int(config.get("priority", 0))
+            for keyword in config.get("keywords", ()):
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                output = ((priority, len(keyword), -order), category)
+                # A keyword listed under two categories goes to the higher rank
+                if keyword not in keywords or output[0] > keywords[keyword][0]:
+                    keywords[keyword] = output
+        self.keyword_count = len(keywords)
+        self._automaton = KeywordAutomaton(keywords)
+
+    @classmethod
+    def from_file(cls, path: Path | str) -> "FoodCategoryTable":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("categories", {}))
+
+    def detect(self, food_name: str) -> Optional[str]:
+        return self._automaton.best_match(food_name.lower())
+
+    def unit_weights(self, category: str) -> Dict[str, float]:
+        return self.rules[category].get("unit_weights", {})
+
+
+def load_food_categories() -> FoodCategoryTable:
+    return FoodCategoryTable.from_file(
+        settings.food_categories_path or DEFAULT_CATEGORIES_PATH
+    )
+
+
+food_categories = load_food_categories()
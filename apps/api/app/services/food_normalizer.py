@@ -0,0 +1,236 @@
+"""
+Fuzzy normalization of vision food names to USDA-friendly search terms.
+
+Rules, synonyms, plural forms and ignorable descriptors are loaded from a
+JSON file (FOOD_NORMALIZATION_PATH, default app/data/food_normalization.json)
+and compiled once into a token index over the rule names and a character
+trigram index over their vocabulary.
+
+A name is canonicalized (lowercase, punctuation stripped, plurals folded,
+synonyms applied), misspelled tokens are corrected to the closest
+vocabulary token, and the rule with the highest IDF-weighted token overlap
+is used if it reaches FOOD_MATCH_THRESHOLD and accounts for every known
+query token. A known token is accounted for if any rule with the same
+value (or the value itself) has it: "steamed white rice" may match "white
+rice" (as "steamed rice" is the same food), while mixed dishes such as
+"curd rice" never match one of their components. Otherwise the name is only
+lowercased and stripped: the canonical tokens are for matching, and the
+original punctuation lets the name still exact-match a USDA description.
+"""
+
+import json
+import math
+import re
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import settings
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / "data" / (
+    "food_normalization.json"
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodNameNormalizer:
+    def __init__(
+        self,
+        rules: Dict[str, str],
+        synonyms: Optional[Dict[str, str]] = None,
+        plurals: Optional[Dict[str, str]] = None,
+        invariants: Iterable[str] = (),
+        descriptors: Iterable[str] = (),
+        match_threshold: float = 0.75,
+        token_threshold: float = 0.6,
+        memo_size: int = 4096,
+    ):
+        self.rules = dict(rules)
+        self.synonyms = {k.lower(): v.lower() for k, v in (synonyms or {}).items()}
+        self.plurals = {k.lower(): v.lower() for k, v in (plurals or {}).items()}
+        self.invariants = {w.lower() for w in invariants}
+        self.descriptors = {w.lower() for w in descriptors}
+        self.match_threshold = match_threshold
+        self.token_threshold = token_threshold
+
+        # Exact canonical forms of rule names, and of rule values so that
+        # normalizing an already-normalized name returns it unchanged
+        self._exact: Dict[str, str] = {}
+        self._values: Dict[str, str] = {}
+        self._rule_values: List[str] = []
+        self._rule_tokens: List[Tuple[str, ...]] = []
+        postings: Dict[str, Set[int]] = defaultdict(set)
+
+        for name, value in self.rules.items():
+            tokens = tuple(self.tokens(name))
+            if not tokens:
+                continue
+            self._exact.setdefault(" ".join(tokens), value)
+            self._values.setdefault(" ".join(self.tokens(value)), value)
+            index = len(self._rule_values)
+            self._rule_values.append(value)
+            self._rule_tokens.append(tokens)
+            for token in tokens:
+                postings[token].add(index)
+
+        rule_count = max(1, len(self._rule_values))
+        self._postings = dict(postings)
+        self._idf = {
+            token: math.log(1 + rule_count / len(ids))
+            for token, ids in self._postings.items()
+        }
+        # Tokens never seen in a rule weigh as much as the rarest one
+        self._unknown_idf = math.log(1 + rule_count)
+        self._rule_token_sets = [frozenset(tokens) for tokens in self._rule_tokens]
+        # Tokens a rule covers: its food's, i.e. those of every rule with
+        # the same value and of the value itself
+        value_tokens: Dict[str, Set[str]] = defaultdict(set)
+        for value, tokens in zip(self._rule_values, self._rule_tokens):
+            value_tokens[value].update(tokens)
+            value_tokens[value].update(self.tokens(value))
+        cover_postings: Dict[str, Set[int]] = defaultdict(set)
+        for index, value in enumerate(self._rule_values):
+            for token in value_tokens[value]:
+                cover_postings[token].add(index)
+        self._cover_postings = dict(cover_postings)
+        self._rule_weights = [
+            sum(self._idf[t] for t in tokens) for tokens in self._rule_token_sets
+        ]
+
+        self._trigram_index: Dict[str, List[str]] = defaultdict(list)
+        self._trigram_counts: Dict[str, int] = {}
+        for token in self._postings:
+            grams = _trigrams(token)
+            self._trigram_counts[token] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].append(token)
+        self._trigram_index = dict(self._trigram_index)
+
+        self.normalize = lru_cache(maxsize=memo_size)(self._normalize)
+
+    @classmethod
+    def from_file(cls, path: Path | str, **kwargs) -> "FoodNameNormalizer":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            rules=data.get("rules", {}),
+            synonyms=data.get("synonyms"),
+            plurals=data.get("plurals"),
+            invariants=data.get("invariants", ()),
+            descriptors=data.get("descriptors", ()),
+            **kwargs,
+        )
+
+    def singularize(self, token: str) -> str:
+        if token in self.plurals:
+            return self.plurals[token]
+        if token in self.invariants or len(token) <= 3 or token[0].isdigit():
+            return token
+        if token.endswith("ies"):
+            return token[:-3] + "y"
+        if token.endswith(("ches", "shes", "xes", "zes", "sses")):
+            return token[:-2]
+        if token.endswith("s") and not token.endswith(("ss", "us")):
+            return token[:-1]
+        return token
+
+    def tokens(self, name: str) -> List[str]:
+        """Canonical tokens: lowercase words, singular, synonyms applied."""
+        result = []
+        for word in _WORD_RE.findall(name.lower()):
+            word = self.synonyms.get(word, word)
+            word = self.singularize(word)
+            # Synonyms may be listed in plural or singular form
+            result.extend(self.synonyms.get(word, word).split())
+        return result
+
+    def correct_token(self, token: str) -> str:
+        """Closest vocabulary token by trigram similarity, for misspellings."""
+        if token in self._postings or len(token) < 4:
+            return token
+        grams = _trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                shared[candidate] += 1
+
+        best, best_score = token, 0.0
+        for candidate, count in shared.items():
+            # Dice coefficient over the two trigram sets
+            score = 2 * count / (len(grams) + self._trigram_counts[candidate])
+            if score > best_score or (score == best_score and candidate < best):
+                best, best_score = candidate, score
+        return best if best_score >= self.token_threshold else token
+
+    def match(self, name: str) -> Optional[Tuple[str, float]]:
+        """Returns (rule value, score) of the best rule for name, if any."""
+        tokens = self.tokens(name)
+        if not tokens:
+            return None
+        canonical = " ".join(tokens)
+        for table in (self._exact, self._values):
+            if canonical in table:
+                return table[canonical], 1.0
+
+        core = [t for t in tokens if t not in self.descriptors] or tokens
+        core = [self.correct_token(t) for t in core]
+        stripped = " ".join(core)
+        if stripped in self._exact:
+            return self._exact[stripped], 1.0
+
+        query = set(core)
+        known = [t for t in query if t in self._idf]
+        if not known:
+            return None
+        unknown_weight = self._unknown_idf * (len(query) - len(known))
+        # Even a rule of exactly the known tokens scores at most this
+        known_weight = sum(self._idf[t] for t in known)
+        if 2 * known_weight / (2 * known_weight + unknown_weight) < self.match_threshold:
+            return None
+
+        # Only rules whose food covers every known token can match, so
+        # candidates are the intersection of those tokens' cover postings,
+        # smallest first, never whole posting lists of tokens like "rice"
+        sets = sorted((self._cover_postings[t] for t in known), key=len)
+        candidates = sets[0].intersection(*sets[1:])
+
+        idf = self._idf
+        best: Optional[Tuple[float, int, int]] = None
+        for index in candidates:
+            rule_tokens = self._rule_token_sets[index]
+            matched = sum(map(idf.__getitem__, rule_tokens.intersection(query)))
+            # Weighted Dice of the shared tokens against both token sets;
+            # query tokens only the rule's food covers are left out
+            score = 2 * matched / (matched + unknown_weight + self._rule_weights[index])
+            candidate = (score, -len(rule_tokens), -index)
+            if best is None or candidate > best:
+                best = candidate
+        if best is None or best[0] < self.match_threshold:
+            return None
+        return self._rule_values[-best[2]], round(best[0], 3)
+
+    def _normalize(self, name: str) -> str:
+        matched = self.match(name)
+        if matched is not None:
+            return matched[0]
+        # Tokens are only for matching; keep the name's own punctuation so
+        # it can still exact-match a USDA description ("broccoli, raw")
+        return name.lower().strip()
+
+
+def load_food_normalizer() -> FoodNameNormalizer:
+    return FoodNameNormalizer.from_file(
+        settings.food_normalization_path or DEFAULT_RULES_PATH,
+        match_threshold=settings.food_match_threshold,
+        token_threshold=settings.food_token_match_threshold,
+    )
+
+
+food_normalizer = load_food_normalizer()
@@ -0,0 +1,73 @@
+"""Process-wide pooled HTTP client for outbound USDA requests."""
+
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+
+_usda_client: Optional[httpx.AsyncClient] = None
+
+
+def get_usda_client() -> httpx.AsyncClient:
+    """
+    Returns the shared USDA client, creating it on first use.
+    Normally created at app startup and closed at shutdown; lazy creation
+    keeps scripts and cron jobs working without the FastAPI lifespan.
+    """
+    global _usda_client
+    if _usda_client is None or _usda_client.is_closed:
+        _usda_client = httpx.AsyncClient(
+            http2=settings.usda_http2,
+            timeout=settings.usda_request_timeout_s,
+            limits=httpx.Limits(
+                max_connections=settings.usda_max_connections,
+                max_keepalive_connections=settings.usda_max_keepalive_connections,
+                keepalive_expiry=settings.usda_keepalive_expiry_s,
+            ),
+        )
+    return _usda_client
+
+
+async def close_usda_client():
+    """Closes the shared client and its pooled connections."""
+    global _usda_client
+    if _usda_client is not None:
+        await _usda_client.aclose()
+        _usda_client = None
+
+
+def usda_pool_stats() -> dict:
+    """
+    Snapshot of the USDA connection pool, used to size the pool limits.
+    Reads httpcore's pool state; fields are zero when the client is not open.
+    """
+    stats = {
+        "open": _usda_client is not None and not _usda_client.is_closed,
+        "http2": settings.usda_http2,
+        "max_connections": settings.usda_max_connections,
+        "max_keepalive_connections": settings.usda_max_keepalive_connections,
+        "connections_total": 0,
+        "connections_in_use": 0,
+        "connections_idle": 0,
+        "requests_active": 0,
+        "requests_waiting": 0,
+    }
+    if not stats["open"]:
+        return stats
+
+    pool = getattr(getattr(_usda_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+
+    connections = list(getattr(pool, "connections", []))
+    requests = list(getattr(pool, "_requests", []))
+    idle = sum(1 for c in connections if c.is_idle())
+    waiting = sum(1 for r in requests if r.is_queued())
+
+    stats["connections_total"] = len(connections)
+    stats["connections_idle"] = idle
+    stats["connections_in_use"] = len(connections) - idle
+    stats["requests_waiting"] = waiting
+    stats["requests_active"] = len(requests) - waiting
+    return stats
@@ -0,0 +1,149 @@
+"""Normalizes uploaded plate photos before vision analysis and storage."""
+
+import io
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, NamedTuple, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Magic-byte signatures of the formats we accept
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+)
+
+_OUTPUT_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+}
+
+
+_lock = threading.Lock()
+
+# Running totals of normalized uploads, exposed through /admin/image-stats
+normalize_totals: Counter = Counter()
+
+
+class InvalidImageError(ValueError):
+    """Raised when an upload is not a decodable JPEG/PNG/WebP image."""
+
+
+class NormalizedImage(NamedTuple):
+    data: bytes
+    content_type: str
+    extension: str
+    width: int
+    height: int
+    detail: str  # OpenAI image detail level: "low" or "high"
+    bytes_in: int
+    bytes_out: int
+    encode_ms: float
+
+
+def extension_for_content_type(content_type: str) -> str:
+    for _, output_type, extension in _OUTPUT_FORMATS.values():
+        if output_type == content_type:
+            return extension
+    return "jpg"
+
+
+def sniff_image_format(data: bytes) -> Optional[str]:
+    """Identifies JPEG/PNG/WebP from the first bytes without decoding."""
+    for signature, fmt in _SIGNATURES:
+        if data.startswith(signature):
+            return fmt
+    if len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def choose_detail(width: int, height: int) -> str:
+    """Picks the vision detail level from VISION_DETAIL ("low", "high" or "auto")."""
+    if settings.vision_detail != "auto":
+        return settings.vision_detail
+    if max(width, height) <= settings.vision_low_detail_max_edge:
+        return "low"
+    return "high"
+
+
+def normalize_image(data: bytes) -> NormalizedImage:
+    """
+    Validates the upload, applies EXIF rotation, downscales to
+    IMAGE_MAX_EDGE_PX and re-encodes without metadata.
+    CPU-bound: call from a worker thread in async code.
+    """
+    started = time.perf_counter()
+
+    if sniff_image_format(data) is None:
+        raise InvalidImageError("Unsupported image format. Use JPEG, PNG or WebP.")
+
+    pil_format, content_type, extension = _OUTPUT_FORMATS.get(
+        settings.image_output_format, _OUTPUT_FORMATS["jpeg"]
+    )
+    max_edge = settings.image_max_edge_px
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        # Let the JPEG decoder downscale by DCT scaling where possible
+        img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+        out = io.BytesIO()
+        img.save(out, format=pil_format, quality=settings.image_quality)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f"Could not decode image: {e}") from e
+
+    result = NormalizedImage(
+        data=out.getvalue(),
+        content_type=content_type,
+        extension=extension,
+        width=img.width,
+        height=img.height,
+        detail=choose_detail(img.width, img.height),
+        bytes_in=len(data),
+        bytes_out=out.tell(),
+        encode_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+    with _lock:
+        normalize_totals["images"] += 1
+        normalize_totals["bytes_in"] += result.bytes_in
+        normalize_totals["bytes_out"] += result.bytes_out
+        normalize_totals["encode_ms"] += result.encode_ms
+        normalize_totals[f"detail_{result.detail}"] += 1
+    logger.info(
+        "Normalized image: %d -> %d bytes, %dx%d, detail=%s, %.1f ms",
+        result.bytes_in,
+        result.bytes_out,
+        result.width,
+        result.height,
+        result.detail,
+        result.encode_ms,
+    )
+    return result
+
+
+def normalize_stats() -> Dict:
+    with _lock:
+        totals = dict(normalize_totals)
+    images = totals.get("images", 0)
+    bytes_in = totals.get("bytes_in", 0)
+    return {
+        "images": images,
+        "bytes_in": bytes_in,
+        "bytes_out": totals.get("bytes_out", 0),
+        "encode_ms": round(totals.get("encode_ms", 0.0), 2),
+        "avg_encode_ms": round(totals["encode_ms"] / images, 2) if images else None,
+        "size_ratio": round(totals["bytes_out"] / bytes_in, 4) if bytes_in else None,
+        "detail_low": totals.get("detail_low", 0),
+        "detail_high": totals.get("detail_high", 0),
+    }
@@ -0,0 +1,87 @@
+"""Long-lived vision model client shared by every scan in the process."""
+
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from app.config import settings
+from app.services.vision_parser import VISION_RESPONSE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+_vision_model: Optional[ChatOpenAI] = None
+_structured_vision_model: Optional[Runnable] = None
+
+
+def get_vision_model(structured: bool = False) -> Runnable:
+    """
+    Returns the shared ChatOpenAI instance, creating it on first use.
+    It owns a pooled keep-alive httpx client, so scans reuse warm
+    connections to the OpenAI API instead of re-handshaking per request.
+    With structured=True the model is bound to VISION_RESPONSE_SCHEMA so
+    the API only returns JSON matching the foods/meal_notes schema.
+    """
+    global _http_client, _vision_model, _structured_vision_model
+    if _vision_model is None or _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry_s,
+            ),
+            timeout=settings.openai_timeout_s,
+        )
+        _vision_model = ChatOpenAI(
+            model=settings.ai_model,
+            api_key=settings.openai_api_key,
+            max_tokens=settings.vision_max_tokens,
+            temperature=0,
+            timeout=settings.openai_timeout_s,
+            max_retries=settings.openai_max_retries,
+            http_async_client=_http_client,
+        )
+        _structured_vision_model = _vision_model.bind(
+            response_format={
+                "type": "json_schema",
+                "json_schema": VISION_RESPONSE_SCHEMA,
+            }
+        )
+    return _structured_vision_model if structured else _vision_model
+
+
+async def warm_vision_model():
+    """
+    Opens OPENAI_PREWARM_CONNECTIONS pooled connections to the OpenAI API
+    ahead of the first scan using cheap concurrent requests.
+    Failures are logged, never raised.
+    """
+    if settings.vision_provider not in ("openai", "record"):
+        return
+    if not settings.openai_api_key or settings.openai_prewarm_connections <= 0:
+        return
+    client = get_vision_model().root_async_client
+    results = await asyncio.gather(
+        *(
+            client.models.retrieve(settings.ai_model)
+            for _ in range(settings.openai_prewarm_connections)
+        ),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        logger.warning(f"Could not pre-warm OpenAI connections: {errors[0]}")
+
+
+async def close_vision_model():
+    """Closes the pooled connections of the shared vision client."""
+    global _http_client, _vision_model, _structured_vision_model
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _vision_model = None
+    _structured_vision_model = None
@@ -0,0 +1,375 @@
+"""
+Offline nutrition lookups against a local SQLite/FTS5 copy of USDA
+FoodData Central (Foundation + SR Legacy), built by import_usda_foods.py.
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.config import settings
+
+# FDC nutrient ids, in order of preference for energy
+ENERGY_NUTRIENT_IDS = [1008, 2047, 2048]
+PROTEIN_NUTRIENT_ID = 1003
+FAT_NUTRIENT_ID = 1004
+CARBS_NUTRIENT_ID = 1005
+TRACKED_NUTRIENT_IDS = set(ENERGY_NUTRIENT_IDS) | {
+    PROTEIN_NUTRIENT_ID,
+    FAT_NUTRIENT_ID,
+    CARBS_NUTRIENT_ID,
+}
+
+# Data types accepted from the bulk downloads (CSV and JSON spellings)
+FDC_DATA_TYPES = {
+    "foundation_food": "Foundation",
+    "sr_legacy_food": "SR Legacy",
+    "Foundation": "Foundation",
+    "SR Legacy": "SR Legacy",
+}
+
+# Same candidate count the remote search asks for
+CANDIDATE_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE foods (
+    fdc_id INTEGER PRIMARY KEY,
+    data_type TEXT NOT NULL,
+    description TEXT NOT NULL,
+    kcal REAL NOT NULL DEFAULT 0,
+    protein REAL NOT NULL DEFAULT 0,
+    carbs REAL NOT NULL DEFAULT 0,
+    fat REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX ix_foods_description ON foods (description COLLATE NOCASE);
+CREATE VIRTUAL TABLE foods_fts USING fts5(
+    description, content='foods', content_rowid='fdc_id'
+);
+CREATE TABLE food_portions (
+    fdc_id INTEGER NOT NULL REFERENCES foods (fdc_id),
+    amount REAL,
+    unit TEXT,
+    modifier TEXT,
+    gram_weight REAL NOT NULL
+);
+CREATE INDEX ix_food_portions_fdc_id ON food_portions (fdc_id);
+"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_connection: Optional[sqlite3.Connection] = None
+_connection_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+
+def _get_connection() -> Optional[sqlite3.Connection]:
+    """Opens the local database read-only on first use; None if not present."""
+    global _connection
+    if _connection is not None:
+        return _connection
+
+    path = settings.local_nutrition_db_path
+    if not path or not os.path.exists(path):
+        return None
+
+    with _connection_lock:
+        if _connection is None:
+            conn = sqlite3.connect(
+                f"file:{path}?mode=ro", uri=True, check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            _connection = conn
+    return _connection
+
+
+def close_local_db():
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
+
+
+def is_local_db_available() -> bool:
+    return _get_connection() is not None
+
+
+def _fts_query(food_name: str, operator: str) -> Optional[str]:
+    tokens = _TOKEN_RE.findall(food_name.lower())
+    if not tokens:
+        return None
+    return f" {operator} ".join(f'"{t}"' for t in tokens)
+
+
+def _candidates(conn: sqlite3.Connection, food_name: str) -> List[sqlite3.Row]:
+    """
+    Full-text candidates ranked by relevance, mirroring the remote search:
+    all terms must match, falling back to any term when that finds nothing.
+    """
+    for operator in ("AND", "OR"):
+        query = _fts_query(food_name, operator)
+        if query is None:
+            return []
+        rows = conn.execute(
+            """
+            SELECT f.fdc_id, f.description, f.kcal, f.protein, f.carbs, f.fat
+            FROM foods_fts
+            JOIN foods f ON f.fdc_id = foods_fts.rowid
+            WHERE foods_fts MATCH ?
+            ORDER BY foods_fts.rank
+            LIMIT ?
+            """,
+            (query, CANDIDATE_LIMIT),
+        ).fetchall()
+        if rows:
+            return rows
+    return []
+
+
+def lookup_local_nutrition(food_name: str) -> Optional[Dict[str, float]]:
+    """
+    Resolves a normalized food name against the local database using the
+    same select_best_food_match rules as the remote USDA path.
+    Returns None if the database is missing or has no match.
+    """
+    from app.services.nutrition import NUTRITION_DEFAULTS, select_best_food_match
+
+    conn = _get_connection()
+    if conn is None:
+        return None
+
+    with _connection_lock:
+        # Exact description match is rule 1 of select_best_food_match
+        row = conn.execute(
+            """
+            SELECT fdc_id, description, kcal, protein, carbs, fat
+            FROM foods WHERE description = ? COLLATE NOCASE LIMIT 1
+            """,
+            (food_name,),
+        ).fetchone()
+        if row is None:
+            candidates = [dict(r) for r in _candidates(conn, food_name)]
+            row = select_best_food_match(candidates, food_name)
+
+    if row is None:
+        return None
+
+    result = NUTRITION_DEFAULTS.copy()
+    result["kcal"] = row["kcal"]
+    result["protein"] = row["protein"]
+    result["carbs"] = row["carbs"]
+    result["fat"] = row["fat"]
+    result["serving_grams"] = serving_grams(get_food_portions(row["fdc_id"]))
+    return result
+
+
+def get_food_portions(fdc_id: int) -> List[Dict[str, object]]:
+    """Household serving sizes (e.g. 1 cup = 158 g) recorded for a food."""
+    conn = _get_connection()
+    if conn is None:
+        return []
+    with _connection_lock:
+        rows = conn.execute(
+            """
+            SELECT amount, unit, modifier, gram_weight
+            FROM food_portions WHERE fdc_id = ?
+            """,
+            (fdc_id,),
+        ).fetchall()
+    return [dict(r) for r in rows]
+
+
+def serving_grams(portions: List[Dict[str, object]]) -> Optional[float]:
+    """
+    Grams in one serving, from a portion labelled as a serving, like the
+    servingSize the remote API reports. Other household measures (cups,
+    slices, ...) are left to the unit map: None when there is no serving.
+    """
+    for portion in portions:
+        label = f"{portion['unit'] or ''} {portion['modifier'] or ''}".lower()
+        if "serving" in label:
+            return round(portion["gram_weight"] / (portion["amount"] or 1.0), 1)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+
+def _pick_nutrients(amounts: Dict[int, float]) -> Dict[str, float]:
+    kcal = 0.0
+    for nid in ENERGY_NUTRIENT_IDS:
+        if nid in amounts:
+            kcal = amounts[nid]
+            break
+    return {
+        "kcal": kcal,
+        "protein": amounts.get(PROTEIN_NUTRIENT_ID, 0.0),
+        "carbs": amounts.get(CARBS_NUTRIENT_ID, 0.0),
+        "fat": amounts.get(FAT_NUTRIENT_ID, 0.0),
+    }
+
+
+def _read_csv(path: Path) -> Iterable[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_csv_dir(directory: Path):
+    """Yields (food, portions) from an extracted FDC CSV download."""
+    foods = {}
+    for row in _read_csv(directory / "food.csv"):
+        data_type = FDC_DATA_TYPES.get(row.get("data_type", ""))
+        if data_type:
+            foods[int(row["fdc_id"])] = {
+                "fdc_id": int(row["fdc_id"]),
+                "data_type": data_type,
+                "description": row["description"],
+                "amounts": {},
+            }
+
+    for row in _read_csv(directory / "food_nutrient.csv"):
+        fdc_id = int(row["fdc_id"])
+        nid = int(row["nutrient_id"])
+        amount = _float(row.get("amount"))
+        if fdc_id in foods and nid in TRACKED_NUTRIENT_IDS and amount is not None:
+            foods[fdc_id]["amounts"][nid] = amount
+
+    units = {}
+    if (directory / "measure_unit.csv").exists():
+        units = {r["id"]: r["name"] for r in _read_csv(directory / "measure_unit.csv")}
+
+    portions: Dict[int, list] = {}
+    if (directory / "food_portion.csv").exists():
+        for row in _read_csv(directory / "food_portion.csv"):
+            fdc_id = int(row["fdc_id"])
+            gram_weight = _float(row.get("gram_weight"))
+            if fdc_id not in foods or not gram_weight:
+                continue
+            unit = units.get(row.get("measure_unit_id", ""))
+            if unit in (None, "undetermined"):
+                unit = row.get("portion_description") or None
+            portions.setdefault(fdc_id, []).append(
+                (
+                    _float(row.get("amount")),
+                    unit,
+                    row.get("modifier") or None,
+                    gram_weight,
+                )
+            )
+
+    for fdc_id, food in foods.items():
+        yield food, portions.get(fdc_id, [])
+
+
+def _load_json_file(path: Path):
+    """Yields (food, portions) from an FDC JSON download."""
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+
+    records = []
+    for key in ("FoundationFoods", "SRLegacyFoods"):
+        records.extend(payload.get(key, []))
+
+    for record in records:
+        data_type = FDC_DATA_TYPES.get(record.get("dataType", ""))
+        if not data_type:
+            continue
+        amounts = {}
+        for fn in record.get("foodNutrients", []):
+            nid = (fn.get("nutrient") or {}).get("id")
+            amount = _float(fn.get("amount"))
+            if nid in TRACKED_NUTRIENT_IDS and amount is not None:
+                amounts[nid] = amount
+        portions = []
+        for fp in record.get("foodPortions", []):
+            gram_weight = _float(fp.get("gramWeight"))
+            if not gram_weight:
+                continue
+            unit = (fp.get("measureUnit") or {}).get("name")
+            if unit in (None, "undetermined"):
+                unit = fp.get("portionDescription") or None
+            portions.append(
+                (_float(fp.get("amount")), unit, fp.get("modifier") or None, gram_weight)
+            )
+        food = {
+            "fdc_id": int(record["fdcId"]),
+            "data_type": data_type,
+            "description": record["description"],
+            "amounts": amounts,
+        }
+        yield food, portions
+
+
+def build_local_db(sources: List[str], output_path: str) -> int:
+    """
+    Builds a fresh database at output_path from FDC bulk downloads
+    (extracted CSV directories and/or JSON files). The file is written
+    next to the target and swapped in atomically. Returns foods imported.
+    """
+    tmp_path = f"{output_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        conn.executescript(SCHEMA)
+        for source in sources:
+            path = Path(source)
+            loader = _load_csv_dir(path) if path.is_dir() else _load_json_file(path)
+            for food, portions in loader:
+                nutrients = _pick_nutrients(food["amounts"])
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO foods
+                        (fdc_id, data_type, description, kcal, protein, carbs, fat)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        food["fdc_id"],
+                        food["data_type"],
+                        food["description"],
+                        nutrients["kcal"],
+                        nutrients["protein"],
+                        nutrients["carbs"],
+                        nutrients["fat"],
+                    ),
+                )
+                conn.execute(
+                    "DELETE FROM food_portions WHERE fdc_id = ?", (food["fdc_id"],)
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO food_portions
+                        (fdc_id, amount, unit, modifier, gram_weight)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    [(food["fdc_id"], *p) for p in portions],
+                )
+                count += 1
+        conn.execute("INSERT INTO foods_fts (foods_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, output_path)
+    close_local_db()
+    return count
@@ -1,10 +1,52 @@
-import httpx
+import asyncio
 import os
 import re
-from typing import Optional, Dict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import numpy as np
+
+from app.config import settings
+from app.services.cache import MISS, TTLCache
+from app.services.fdc_index import forget_fdc_ids, lookup_fdc_ids, save_fdc_ids
+from app.services.food_categories import food_categories
+from app.services.food_normalizer import food_normalizer
+from app.services.http_client import get_usda_client
+from app.services.local_nutrition import is_local_db_available, lookup_local_nutrition
 
 USDA_API_KEY = os.getenv("USDA_API_KEY")
-USDA_API_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
+USDA_API_URL = f"{settings.usda_api_base_url}/foods/search"
+USDA_FOODS_URL = f"{settings.usda_api_base_url}/foods"
+
+# Nutrient numbers (the /foods "nutrients" filter takes numbers, not ids);
+# energy in order of preference: kcal, Atwater general, Atwater specific
+ENERGY_NUTRIENT_NUMBERS = ["208", "957", "958"]
+PROTEIN_NUTRIENT_NUMBER = "203"
+FAT_NUTRIENT_NUMBER = "204"
+CARBS_NUTRIENT_NUMBER = "205"
+TRACKED_NUTRIENT_NUMBERS = ENERGY_NUTRIENT_NUMBERS + [
+    PROTEIN_NUTRIENT_NUMBER,
+    FAT_NUTRIENT_NUMBER,
+    CARBS_NUTRIENT_NUMBER,
+]
+
+# POST /foods accepts at most this many FDC IDs per request
+FDC_FOODS_MAX_IDS = 20
+
+# Per-100g nutrition keyed by normalized food name; None marks "not found"
+nutrition_cache = TTLCache(
+    max_entries=settings.nutrition_cache_max_entries,
+    default_ttl_s=settings.nutrition_cache_ttl_s,
+)
 
 # Static Portion Map (MVP)
 PORTION_MAP = {
@@ -17,20 +59,8 @@ PORTION_MAP = {
     "serving": 150.0,
 }
 
-# Normalization Rules (MVP)
-FOOD_NORMALIZATION_RULES = {
-    "dal": "lentils, cooked",
-    "white rice": "rice, white, cooked long grain",
-    "brown rice": "rice, brown, cooked",
-    "chicken curry": "chicken, meat only, cooked, stewed",
-    "biryani": "rice, white, cooked long grain",
-    "chapati": "bread, whole wheat, commercially prepared",
-    "roti": "bread, whole wheat, commercially prepared",
-    "naan": "naan",
-    "paneer": "cheese, paneer",
-    "yogurt": "yogurt, plain, whole milk",
-    "curd": "yogurt, plain, whole milk",
-}
+# Normalization rules, loaded from app/data/food_normalization.json
+FOOD_NORMALIZATION_RULES = food_normalizer.rules
 
 FOOD_PORTION_MAP = {
     "rice, white, cooked long grain": {"cup": 158.0, "bowl": 240.0},
@@ -51,28 +81,22 @@ DEFAULT_UNIT_MAP = {
     "serving": 150.0,
 }
 
-FOOD_CATEGORY_RULES = {
-    "fruit_whole": {
-        "keywords": ["apple", "banana", "orange", "mango", "pear", "guava"],
-        "unit_weights": {"piece": 150.0},
-    },
-    "flatbread": {
-        "keywords": ["chapati", "roti", "naan", "paratha"],
-        "unit_weights": {"piece": 40.0},
-    },
-    "pizza": {"keywords": ["pizza"], "unit_weights": {"slice": 125.0}},
-    "rice_grain": {"keywords": ["rice"], "unit_weights": {"cup": 158.0, "bowl": 240.0}},
-    "lentil_curry": {
-        "keywords": ["lentil", "dal"],
-        "unit_weights": {"cup": 198.0, "bowl": 240.0},
-    },
+# Returned (as a copy) whenever USDA has no usable answer for an item
+NUTRITION_DEFAULTS = {
+    "kcal": 0.0,
+    "protein": 0.0,
+    "carbs": 0.0,
+    "fat": 0.0,
+    "serving_grams": None,
 }
 
+# Portion categories, loaded from app/data/food_categories.json
+FOOD_CATEGORY_RULES = food_categories.rules
+
 
 def normalize_food_name(name: str) -> str:
-    """Normalizes GPT food names to USDA-friendly terms."""
-    normalized = name.lower().strip()
-    return FOOD_NORMALIZATION_RULES.get(normalized, normalized)
+    """Normalizes GPT food names to USDA-friendly terms (fuzzy, memoized)."""
+    return food_normalizer.normalize(name)
 
 
 # def get_portion_grams(portion_str: str) -> float:
@@ -98,12 +122,8 @@ def normalize_food_name(name: str) -> str:
 
 
 def detect_food_category(food_name: str) -> Optional[str]:
-    food_name = food_name.lower()
-    for category, config in FOOD_CATEGORY_RULES.items():
-        for keyword in config["keywords"]:
-            if keyword in food_name:
-                return category
-    return None
+    """Portion category of a food name (one pass over all keywords)."""
+    return food_categories.detect(food_name)
 
 
 def normalize_portion_string(portion: str) -> str:
@@ -115,9 +135,13 @@ def normalize_portion_string(portion: str) -> str:
     return portion
 
 
-def get_portion_grams(
+def parse_portion(
     food_name: str, portion_str: str, usda_serving_grams: Optional[float] = None
-) -> float:
+) -> Tuple[float, float]:
+    """
+    Splits a portion into (quantity, grams per unit); get_portion_grams is
+    their product. Portions without a known unit are (1, 150).
+    """
     portion_str = normalize_portion_string(portion_str)
 
     match = re.search(r"(\d+(?:\.\d+)?)", portion_str)
@@ -130,21 +154,30 @@ def get_portion_grams(
             break
 
     if not unit:
-        return 150.0
+        return 1.0, 150.0
 
     # 1️⃣ USDA serving override
     if usda_serving_grams:
-        return quantity * usda_serving_grams
+        return quantity, usda_serving_grams
 
     # 2️⃣ Category-based
     category = detect_food_category(food_name)
     if category:
-        category_units = FOOD_CATEGORY_RULES[category]["unit_weights"]
+        category_units = food_categories.unit_weights(category)
         if unit in category_units:
-            return quantity * category_units[unit]
+            return quantity, category_units[unit]
 
     # 3️⃣ Default fallback
-    return quantity * DEFAULT_UNIT_MAP.get(unit, 150.0)
+    return quantity, DEFAULT_UNIT_MAP.get(unit, 150.0)
+
+
+def get_portion_grams(
+    food_name: str, portion_str: str, usda_serving_grams: Optional[float] = None
+) -> float:
+    quantity, grams_per_unit = parse_portion(
+        food_name, portion_str, usda_serving_grams
+    )
+    return quantity * grams_per_unit
 
 
 def select_best_food_match(foods, search_term):
@@ -181,74 +214,237 @@ def select_best_food_match(foods, search_term):
 
 async def get_usda_nutrition(food_name: str) -> Dict[str, float]:
     """
-    Fetches nutrition data (kcal, protein, carbs, fat) per 100g from USDA API.
+    Fetches nutrition data (kcal, protein, carbs, fat) per 100g, from the
+    local FoodData Central database first and the USDA API as a fallback.
     Returns 0.0 for all values if not found or API key missing.
+    Answers (including "not found") are cached per normalized food name.
+    """
+    return (await get_usda_nutrition_batch([normalize_food_name(food_name)]))[0]
+
+
+async def get_usda_nutrition_batch(
+    food_names: List[str],
+    on_result: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None,
+) -> List[Dict[str, float]]:
     """
-    defaults = {
-        "kcal": 0.0,
-        "protein": 0.0,
-        "carbs": 0.0,
-        "fat": 0.0,
-        "serving_grams": None,
-    }
-    if not USDA_API_KEY:
+    get_usda_nutrition for many already normalized names at once, in input
+    order. Names not answered by the cache or the local database go to the
+    USDA API together (see fetch_usda_nutrition_batch), with searches
+    bounded by USDA_MAX_CONCURRENCY; a lookup exceeding USDA_ITEM_TIMEOUT_S
+    falls back to NUTRITION_DEFAULTS instead of holding up the scan.
+    on_result is awaited with (index, nutrition) as soon as each answer is
+    known.
+    """
+    positions: Dict[str, List[int]] = {}
+    for index, key in enumerate(food_names):
+        positions.setdefault(key, []).append(index)
+    results: List[Dict[str, float]] = [NUTRITION_DEFAULTS] * len(food_names)
+
+    async def resolve(key: str, nutrition: Optional[Dict[str, float]]):
+        for index in positions[key]:
+            results[index] = (nutrition or NUTRITION_DEFAULTS).copy()
+            if on_result:
+                await on_result(index, results[index])
+
+    remote = []
+    for key in positions:
+        cached = nutrition_cache.get(key)
+        if cached is not MISS:
+            await resolve(key, cached)
+            continue
+
+        # 1. Local FoodData Central copy
+        result = lookup_local_nutrition(key)
+        if result is not None:
+            nutrition_cache.set(key, result)
+            await resolve(key, result)
+            continue
+        remote.append(key)
+
+    # 2. Remote USDA API (optional fallback)
+    fetched: Dict[str, Optional[Dict[str, float]]] = {}
+    if remote and not settings.usda_remote_fallback:
+        if is_local_db_available():
+            fetched = {key: None for key in remote}
+    elif remote and not USDA_API_KEY:
         print("WARNING: USDA_API_KEY not set")
-        return defaults
+    elif remote:
+        fetched = await fetch_usda_nutrition_batch(remote)
+
+    for key in remote:
+        if key not in fetched:
+            # Transient failures are not cached
+            await resolve(key, None)
+            continue
+        result = fetched[key]
+        if result is None:
+            nutrition_cache.set(
+                key, None, ttl_s=settings.nutrition_cache_negative_ttl_s
+            )
+        else:
+            nutrition_cache.set(key, result)
+        await resolve(key, result)
+
+    return results
+
 
+async def fetch_usda_nutrition_batch(
+    food_names: List[str],
+) -> Dict[str, Optional[Dict[str, float]]]:
+    """
+    Two-tier USDA lookup: each name is resolved to an FDC ID (the FDC
+    index, or a search on a miss), then the nutrients of all IDs are
+    fetched with one filtered /foods request. Maps name -> per-100g
+    nutrition, or None when USDA has no match; names that failed
+    transiently are left out.
+    """
+    fdc_ids = await resolve_fdc_ids(food_names)
+    wanted = sorted({fdc_id for fdc_id in fdc_ids.values() if fdc_id is not None})
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                USDA_API_URL,
-                params={
-                    "api_key": USDA_API_KEY,
-                    "query": food_name,
-                    "pageSize": 50,
-                    "dataType": [
-                        "Foundation",
-                        "SR Legacy",
-                    ],
-                },
-                timeout=5.0,
-            )
-            data = response.json()
-            foods = data.get("foods", [])
-            if not foods:
-                return defaults
-
-            food = select_best_food_match(foods, food_name)
-            nutrients = food.get("foodNutrients", [])
-            result = defaults.copy()
-
-            # Extract serving size if available
-            result["serving_grams"] = food.get("servingSize")
-
-            for nutrient in nutrients:
-                nid = nutrient.get("nutrientId")
-                val = float(nutrient.get("value", 0.0))
-                # 1008, 2047, 2048: Energy (kcal)
-                if nid in [1008, 2047, 2048]:
-                    result["kcal"] = val
-                # 1003: Protein
-                elif nid == 1003:
-                    result["protein"] = val
-                # 1005: Carbohydrate, by difference
-                elif nid == 1005:
-                    result["carbs"] = val
-                # 1004: Total lipid (fat)
-                elif nid == 1004:
-                    result["fat"] = val
-
-            return result
+        details = await asyncio.wait_for(
+            fetch_fdc_nutrients(wanted), timeout=settings.usda_item_timeout_s
+        )
     except Exception as e:
         print(f"USDA API Error: {e}")
-        return defaults
+        return {name: None for name, fdc_id in fdc_ids.items() if fdc_id is None}
+
+    results: Dict[str, Optional[Dict[str, float]]] = {}
+    stale = []
+    for name, fdc_id in fdc_ids.items():
+        if fdc_id is None:
+            results[name] = None
+        elif fdc_id in details:
+            results[name] = details[fdc_id]
+        else:
+            stale.append(name)  # Retired by USDA; chosen again next time
+    if stale:
+        await forget_fdc_ids(stale)
+    return results
+
+
+async def resolve_fdc_ids(food_names: List[str]) -> Dict[str, Optional[int]]:
+    """
+    FDC ID per name from the FDC index; names not indexed yet are searched
+    concurrently (bounded by USDA_MAX_CONCURRENCY and USDA_ITEM_TIMEOUT_S)
+    and their choice saved. None means no match; failed searches are left
+    out.
+    """
+    resolved: Dict[str, Optional[int]] = dict(await lookup_fdc_ids(food_names))
+    missing = [name for name in food_names if name not in resolved]
+    if not missing:
+        return resolved
+
+    semaphore = asyncio.Semaphore(max(1, settings.usda_max_concurrency))
+    chosen: Dict[str, Tuple[int, str]] = {}
+
+    async def search(name: str):
+        async with semaphore:
+            try:
+                food = await asyncio.wait_for(
+                    search_usda_food(name), timeout=settings.usda_item_timeout_s
+                )
+            except asyncio.TimeoutError:
+                print(f"USDA lookup timed out for '{name}', using defaults")
+                return
+            except Exception as e:
+                print(f"USDA API Error: {e}")
+                return
+        if food is None:
+            resolved[name] = None
+        else:
+            resolved[name] = food["fdcId"]
+            chosen[name] = (food["fdcId"], food.get("description"))
+
+    await asyncio.gather(*(search(name) for name in missing))
+    await save_fdc_ids(chosen)
+    return resolved
+
+
+async def search_usda_food(food_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Queries the USDA search API and returns the best matching hit, or None
+    when USDA has no match; raises on transport errors.
+    """
+    client = get_usda_client()
+    response = await client.get(
+        USDA_API_URL,
+        params={
+            "api_key": USDA_API_KEY,
+            "query": food_name,
+            "pageSize": 50,
+            "dataType": [
+                "Foundation",
+                "SR Legacy",
+            ],
+        },
+    )
+    # Quota/server errors must raise so they are not cached as "not found"
+    response.raise_for_status()
+    data = response.json()
+    foods = data.get("foods", [])
+    if not foods:
+        return None
 
+    return select_best_food_match(foods, food_name)
 
-def calculate_calories(
-    grams: float, kcal_per_100g: float, cooking_style: Optional[str] = None
-) -> float:
-    """Calculates total calories with cooking style adjustments."""
-    base_calories = (grams / 100.0) * kcal_per_100g
+
+async def fetch_fdc_nutrients(fdc_ids: List[int]) -> Dict[int, Dict[str, float]]:
+    """
+    Per-100g nutrients of many foods via POST /foods, asking only for the
+    tracked nutrients (a few hundred bytes per food). Foods USDA no longer
+    serves are absent from the result; raises on transport errors.
+    """
+    client = get_usda_client()
+
+    async def fetch(chunk: List[int]) -> List[Dict[str, Any]]:
+        response = await client.post(
+            USDA_FOODS_URL,
+            params={"api_key": USDA_API_KEY},
+            json={
+                "fdcIds": chunk,
+                "format": "abridged",
+                "nutrients": TRACKED_NUTRIENT_NUMBERS,
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    if not fdc_ids:
+        return {}
+    chunks = [
+        fdc_ids[i : i + FDC_FOODS_MAX_IDS]
+        for i in range(0, len(fdc_ids), FDC_FOODS_MAX_IDS)
+    ]
+    results = {}
+    for foods in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+        for food in foods:
+            results[food["fdcId"]] = extract_fdc_nutrients(food)
+    return results
+
+
+def extract_fdc_nutrients(food: Dict[str, Any]) -> Dict[str, float]:
+    """Per-100g kcal and macros of an abridged (or full) /foods entry."""
+    amounts = {}
+    for nutrient in food.get("foodNutrients", []):
+        # Abridged entries carry "number"; full ones nest it under "nutrient"
+        number = nutrient.get("number") or nutrient.get("nutrient", {}).get("number")
+        if number is not None:
+            amounts[str(number)] = float(nutrient.get("amount") or 0.0)
+
+    result = NUTRITION_DEFAULTS.copy()
+    result["serving_grams"] = food.get("servingSize")
+    for number in ENERGY_NUTRIENT_NUMBERS:
+        if number in amounts:
+            result["kcal"] = amounts[number]
+            break
+    result["protein"] = amounts.get(PROTEIN_NUTRIENT_NUMBER, 0.0)
+    result["carbs"] = amounts.get(CARBS_NUTRIENT_NUMBER, 0.0)
+    result["fat"] = amounts.get(FAT_NUTRIENT_NUMBER, 0.0)
+    return result
+
+
+def cooking_style_multiplier(cooking_style: Optional[str]) -> float:
+    """Calorie adjustment for added oil/sauce implied by the cooking style."""
     multiplier = 1.0
 
     if cooking_style:
@@ -262,4 +458,73 @@ def calculate_calories(
         elif "baked" in style:
             multiplier += 0.05
 
+    return multiplier
+
+
+def calculate_calories(
+    grams: float, kcal_per_100g: float, cooking_style: Optional[str] = None
+) -> float:
+    """Calculates total calories with cooking style adjustments."""
+    base_calories = (grams / 100.0) * kcal_per_100g
+    multiplier = cooking_style_multiplier(cooking_style)
+
     return round(base_calories * multiplier, -1)
+
+
+class PortionBatch(NamedTuple):
+    """Per-item results of compute_portions_batch, as float64 arrays."""
+
+    grams: np.ndarray
+    kcal: np.ndarray
+    protein: np.ndarray
+    carbs: np.ndarray
+    fat: np.ndarray
+
+
+def _round_like_python(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """
+    np.round, but equal to Python's round() element for element. np.round
+    scales, rounds and unscales, so it differs only where the scaled value
+    lands exactly on .5 through representation error (0.15 -> 0.2, while
+    round(0.15, 1) == 0.1). Those rare ties are redone with round().
+    """
+    if ndigits >= 0:
+        scaled = values * 10.0**ndigits
+        result = np.round(scaled) / 10.0**ndigits
+    else:
+        scaled = values / 10.0**-ndigits
+        result = np.round(scaled) * 10.0**-ndigits
+    ties = np.flatnonzero(scaled - np.floor(scaled) == 0.5)
+    for i in ties:
+        result[i] = round(float(values[i]), ndigits)
+    return result
+
+
+def compute_portions_batch(
+    quantities: Sequence[float],
+    grams_per_unit: Sequence[float],
+    kcal_per_100g: Sequence[float],
+    protein_per_100g: Sequence[float],
+    carbs_per_100g: Sequence[float],
+    fat_per_100g: Sequence[float],
+    multipliers: Sequence[float],
+) -> PortionBatch:
+    """
+    Vectorized get_portion_grams / calculate_calories / macro scaling for
+    many items at once (see parse_portion and cooking_style_multiplier for
+    the inputs). Each element equals the scalar result exactly.
+    """
+    def column(values: Sequence[float]) -> np.ndarray:
+        return np.asarray(values, dtype=np.float64)
+
+    grams = column(quantities) * column(grams_per_unit)
+    scale = grams / 100.0
+    # Same operation order as the scalar path, so each float matches
+    kcal = (scale * column(kcal_per_100g)) * column(multipliers)
+    return PortionBatch(
+        grams=grams,
+        kcal=_round_like_python(kcal, -1),
+        protein=_round_like_python(column(protein_per_100g) * scale, 1),
+        carbs=_round_like_python(column(carbs_per_100g) * scale, 1),
+        fat=_round_like_python(column(fat_per_100g) * scale, 1),
+    )
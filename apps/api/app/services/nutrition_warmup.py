@@ -0,0 +1,135 @@
+"""
+Background warm-up of the nutrition cache after a deploy.
+
+The most frequent normalized_name values in recent MealLog.items are
+looked up ahead of the first scans, NUTRITION_WARMUP_BATCH_SIZE names at a
+time through get_usda_nutrition_batch (so each batch is one bulk USDA
+request, with its searches bounded by USDA_MAX_CONCURRENCY). The task runs
+after startup and never blocks it; progress is exposed by warmup_stats().
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import MealLog
+from app.services.nutrition import get_usda_nutrition_batch, nutrition_cache
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupProgress:
+    def __init__(self):
+        self.state = "idle"  # idle | mining | warming | done | failed
+        self.logs_scanned = 0
+        self.names_total = 0
+        self.names_already_cached = 0
+        self.names_warmed = 0
+        self.started_at: Optional[float] = None
+        self.mining_s: Optional[float] = None
+        self.duration_s: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def stats(self) -> Dict:
+        elapsed = self.duration_s
+        if elapsed is None and self.started_at is not None:
+            elapsed = time.monotonic() - self.started_at
+        to_warm = self.names_total - self.names_already_cached
+        return {
+            "enabled": settings.nutrition_warmup_enabled,
+            "state": self.state,
+            "logs_scanned": self.logs_scanned,
+            "names_total": self.names_total,
+            "names_already_cached": self.names_already_cached,
+            "names_warmed": self.names_warmed,
+            "progress": round(self.names_warmed / to_warm, 3) if to_warm else 1.0,
+            "mining_s": round(self.mining_s, 2) if self.mining_s is not None else None,
+            "elapsed_s": round(elapsed, 2) if elapsed is not None else None,
+            "error": self.error,
+        }
+
+
+warmup_progress = WarmupProgress()
+
+
+def top_food_names(limit: int, lookback_days: int) -> Tuple[List[str], int]:
+    """
+    The limit most frequent item normalized_names of recent meal logs, and
+    how many logs were read.
+    """
+    db = SessionLocal()
+    counts: Counter = Counter()
+    logs_scanned = 0
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=lookback_days)
+        rows = (
+            db.query(MealLog.items)
+            .filter(MealLog.created_at >= cutoff, MealLog.items.isnot(None))
+            .yield_per(1000)
+        )
+        for (items,) in rows:
+            logs_scanned += 1
+            for item in items or ():
+                name = item.get("normalized_name") if isinstance(item, dict) else None
+                if name:
+                    counts[name] += 1
+    finally:
+        db.close()
+    return [name for name, _ in counts.most_common(limit)], logs_scanned
+
+
+async def warm_nutrition_cache():
+    """
+    Prefetches nutrition for the top NUTRITION_WARMUP_TOP_N foods of the
+    last NUTRITION_WARMUP_LOOKBACK_DAYS. Failures are logged, never raised.
+    """
+    if not settings.nutrition_warmup_enabled:
+        return
+    progress = warmup_progress
+    progress.started_at = time.monotonic()
+    try:
+        progress.state = "mining"
+        # No point warming more names than the cache holds
+        limit = min(settings.nutrition_warmup_top_n, nutrition_cache.max_entries)
+        names, progress.logs_scanned = await run_in_threadpool(
+            top_food_names, limit, settings.nutrition_warmup_lookback_days
+        )
+        progress.mining_s = time.monotonic() - progress.started_at
+        progress.names_total = len(names)
+
+        pending = [name for name in names if name not in nutrition_cache]
+        progress.names_already_cached = len(names) - len(pending)
+        progress.state = "warming"
+        batch_size = max(1, settings.nutrition_warmup_batch_size)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start : start + batch_size]
+            await get_usda_nutrition_batch(batch)
+            progress.names_warmed += len(batch)
+
+        progress.state = "done"
+    except asyncio.CancelledError:
+        progress.state = "failed"
+        progress.error = "cancelled"
+        raise
+    except Exception as e:
+        progress.state = "failed"
+        progress.error = str(e)
+        logger.warning(f"Nutrition cache warm-up failed: {e}")
+    finally:
+        progress.duration_s = time.monotonic() - progress.started_at
+        logger.info(
+            f"Nutrition cache warm-up {progress.state}: "
+            f"{progress.names_warmed}/{progress.names_total} foods "
+            f"in {progress.duration_s:.1f}s"
+        )
+
+
+def warmup_stats() -> Dict:
+    return warmup_progress.stats()
@@ -0,0 +1,123 @@
+"""Durable cache of vision results keyed by image content hash."""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import ScanResultCache
+
+_DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+_inserts_since_prune = 0
+
+
+def scan_cache_key(
+    image_bytes: bytes, plate_size_cm: Optional[float], model_name: str, detail: str
+) -> str:
+    """SHA-256 over the image bytes, plate size, model name and detail level."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0")
+    digest.update(repr(plate_size_cm).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(detail.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def get_cached_vision_result(db: Session, cache_key: str) -> Optional[Dict[str, Any]]:
+    """Returns the cached vision JSON for this key, or None if absent/expired."""
+    if not settings.scan_cache_enabled:
+        return None
+
+    entry = (
+        db.query(ScanResultCache)
+        .filter(
+            ScanResultCache.cache_key == cache_key,
+            ScanResultCache.expires_at > datetime.utcnow(),
+        )
+        .first()
+    )
+    if entry is None:
+        return None
+
+    # Persisted with the caller's next commit
+    entry.hit_count += 1
+    return entry.result
+
+
+def add_vision_result(
+    db: Session, cache_key: str, model_name: str, result: Dict[str, Any]
+):
+    """
+    Upserts a vision result within the caller's transaction (no commit).
+    INSERT ... ON CONFLICT keeps a concurrent insert of the same key from
+    failing the whole scan. Every SCAN_CACHE_PRUNE_INTERVAL inserts, expired
+    and excess entries are pruned in the same transaction.
+    """
+    global _inserts_since_prune
+    if not settings.scan_cache_enabled:
+        return
+
+    now = datetime.utcnow()
+    values = {
+        "cache_key": cache_key,
+        "model_name": model_name,
+        "result": result,
+        "hit_count": 0,
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=settings.scan_cache_ttl_s),
+    }
+    insert = _DIALECT_INSERTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        # Other databases: plain insert, skipped if the key already exists
+        if db.query(ScanResultCache.id).filter_by(cache_key=cache_key).first():
+            return
+        db.add(ScanResultCache(**values))
+    else:
+        stmt = insert(ScanResultCache).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ScanResultCache.cache_key],
+            set_={
+                "result": stmt.excluded.result,
+                "model_name": stmt.excluded.model_name,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+        )
+        db.execute(stmt)
+
+    _inserts_since_prune += 1
+    if _inserts_since_prune >= settings.scan_cache_prune_interval:
+        _inserts_since_prune = 0
+        prune_scan_cache(db, now)
+
+
+def prune_scan_cache(db: Session, now: Optional[datetime] = None) -> int:
+    """Deletes expired entries and the oldest ones beyond SCAN_CACHE_MAX_ENTRIES."""
+    now = now or datetime.utcnow()
+    removed = (
+        db.query(ScanResultCache)
+        .filter(ScanResultCache.expires_at <= now)
+        .delete(synchronize_session=False)
+    )
+
+    overflow_ids = (
+        db.query(ScanResultCache.id)
+        .order_by(ScanResultCache.created_at.desc())
+        .offset(settings.scan_cache_max_entries)
+        .subquery()
+    )
+    removed += (
+        db.query(ScanResultCache)
+        .filter(ScanResultCache.id.in_(db.query(overflow_ids.c.id)))
+        .delete(synchronize_session=False)
+    )
+    return removed
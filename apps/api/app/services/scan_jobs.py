@@ -0,0 +1,336 @@
+"""Postgres-backed queue and bounded worker pool for asynchronous scans."""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import MealLog, ScanJob, User
+from app.schemas import ScanJobResponse, ScanResponse
+from app.services.image_processing import NormalizedImage
+from app.services.scan_pipeline import run_scan, INSUFFICIENT_SCANS_DETAIL
+from app.services.url_helper import get_s3_url
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "running")
+
+# Rejections (admission control, open circuit breaker) that re-queue a job
+# for after their Retry-After instead of failing it
+RETRYABLE_STATUSES = (
+    status.HTTP_429_TOO_MANY_REQUESTS,
+    status.HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+
+class ScanQueueFullError(Exception):
+    """Raised when a job cannot be accepted; carries the HTTP status to return."""
+
+    def __init__(self, detail: str, status_code: int, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def enqueue_scan_job(
+    db: Session,
+    user: User,
+    image: NormalizedImage,
+    plate_size_cm: float | None = None,
+    idempotency_key: Optional[str] = None,
+) -> ScanJob:
+    """
+    Queues a normalized image for analysis. A repeated idempotency key
+    returns the existing job. Raises ScanQueueFullError when the global
+    queue or the user's pending jobs are at their limits.
+    """
+    if idempotency_key:
+        existing = find_job_by_idempotency_key(db, user.id, idempotency_key)
+        if existing is not None:
+            return existing
+
+    pending_total = (
+        db.query(func.count(ScanJob.id))
+        .filter(ScanJob.status.in_(PENDING_STATUSES))
+        .scalar()
+    )
+    if pending_total >= settings.scan_job_max_queue_depth:
+        raise ScanQueueFullError(
+            "Scan queue is full. Please try again shortly.",
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            retry_after=max(1, int(settings.scan_job_poll_interval_s * 5)),
+        )
+
+    pending_for_user = (
+        db.query(func.count(ScanJob.id))
+        .filter(ScanJob.user_id == user.id, ScanJob.status.in_(PENDING_STATUSES))
+        .scalar()
+    )
+    if pending_for_user >= settings.scan_job_max_pending_per_user:
+        raise ScanQueueFullError(
+            "Too many scans in progress. Please wait for them to finish.",
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            retry_after=max(1, int(settings.scan_job_poll_interval_s * 2)),
+        )
+
+    job = ScanJob(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        idempotency_key=idempotency_key,
+        status="queued",
+        image_data=image.data,
+        content_type=image.content_type,
+        detail=image.detail,
+        plate_size_cm=plate_size_cm,
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent retry carrying the same key
+        db.rollback()
+        existing = find_job_by_idempotency_key(db, user.id, idempotency_key)
+        if existing is None:
+            raise
+        return existing
+
+    scan_job_pool.notify()
+    return job
+
+
+def find_job_by_idempotency_key(
+    db: Session, user_id: int, idempotency_key: Optional[str]
+) -> Optional[ScanJob]:
+    return (
+        db.query(ScanJob)
+        .filter(
+            ScanJob.user_id == user_id,
+            ScanJob.idempotency_key == idempotency_key,
+        )
+        .first()
+    )
+
+
+def get_scan_job(db: Session, user_id: int, job_id: str) -> Optional[ScanJob]:
+    return (
+        db.query(ScanJob)
+        .filter(ScanJob.id == job_id, ScanJob.user_id == user_id)
+        .first()
+    )
+
+
+def serialize_scan_job(db: Session, job: ScanJob) -> ScanJobResponse:
+    """Builds the API view of a job, re-signing the photo URL of finished scans."""
+    result = None
+    if job.result:
+        result = ScanResponse(**job.result)
+        if result.log_id:
+            log = (
+                db.query(MealLog.photo_url).filter(MealLog.id == result.log_id).first()
+            )
+            if log:
+                result.photo_url = get_s3_url(log.photo_url)
+
+    return ScanJobResponse(
+        id=job.id,
+        status=job.status,
+        created_at=job.created_at.isoformat(),
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+        result=result,
+        error=job.error,
+    )
+
+
+def claim_next_job(db: Session) -> Optional[str]:
+    """
+    Marks the oldest queued job (or one orphaned by a crashed worker) as
+    running and returns its id. SKIP LOCKED lets workers in every process
+    poll the same table without blocking each other.
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.scan_job_stale_after_s)
+
+    job = (
+        db.query(ScanJob)
+        .filter(
+            or_(
+                and_(
+                    ScanJob.status == "queued",
+                    or_(ScanJob.run_after.is_(None), ScanJob.run_after <= now),
+                ),
+                and_(ScanJob.status == "running", ScanJob.started_at < stale_before),
+            )
+        )
+        .order_by(ScanJob.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+
+    if job.attempts >= settings.scan_job_max_attempts:
+        _finish_job(job, error="Scan could not be completed. Please try again.")
+        db.commit()
+        return None
+
+    job.status = "running"
+    job.started_at = now
+    job.attempts += 1
+    db.commit()
+    return job.id
+
+
+def _finish_job(
+    job: ScanJob,
+    result: Optional[dict] = None,
+    error: Optional[str] = None,
+    error_status: Optional[int] = None,
+):
+    job.status = "succeeded" if error is None else "failed"
+    job.result = result
+    job.error = error
+    job.error_status = error_status
+    job.image_data = None
+    job.finished_at = datetime.utcnow()
+
+
+def _requeue_job(job: ScanJob, retry_after_s: int):
+    """Puts a job back in the queue without spending an attempt."""
+    job.status = "queued"
+    job.attempts = max(0, job.attempts - 1)
+    job.started_at = None
+    job.run_after = datetime.utcnow() + timedelta(seconds=retry_after_s)
+
+
+def _claim_next_job_in_session() -> Optional[str]:
+    db = SessionLocal()
+    try:
+        return claim_next_job(db)
+    finally:
+        db.close()
+
+
+def _load_job(db: Session, job_id: str):
+    job = db.get(ScanJob, job_id)
+    return job, db.get(User, job.user_id)
+
+
+async def process_scan_job(job_id: str):
+    """
+    Runs the regular scan pipeline for a claimed job in its own session.
+    The job is marked succeeded in the transaction that saves its MealLog,
+    so a crash in between can never leave a charged scan to be re-run.
+    Jobs rejected for overload go back to the queue until Retry-After.
+    """
+    db = SessionLocal()
+    try:
+        job, user = await run_in_threadpool(_load_job, db, job_id)
+
+        if user.scans_remaining <= 0:
+            _finish_job(
+                job,
+                error=INSUFFICIENT_SCANS_DETAIL,
+                error_status=status.HTTP_402_PAYMENT_REQUIRED,
+            )
+            await run_in_threadpool(db.commit)
+            return
+
+        try:
+            response = await run_scan(
+                db,
+                user,
+                job.image_data,
+                content_type=job.content_type,
+                detail=job.detail,
+                plate_size_cm=job.plate_size_cm,
+                before_commit=lambda r: _finish_job(job, result=r.model_dump()),
+            )
+        except HTTPException as e:
+            await run_in_threadpool(db.rollback)
+            retry_after = (e.headers or {}).get("Retry-After")
+            if e.status_code in RETRYABLE_STATUSES and retry_after is not None:
+                # Admission or breaker rejection: overload, not a bad scan
+                await run_in_threadpool(_requeue_job, job, int(retry_after))
+            else:
+                _finish_job(job, error=str(e.detail), error_status=e.status_code)
+        except Exception:
+            logger.exception(f"Scan job {job_id} failed")
+            await run_in_threadpool(db.rollback)
+            _finish_job(
+                job,
+                error="Scan failed. Please try again.",
+                error_status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        else:
+            if job.status != "succeeded":
+                # Served by another caller's scan: nothing was committed yet
+                _finish_job(job, result=response.model_dump())
+        await run_in_threadpool(db.commit)
+    finally:
+        db.close()
+
+
+class ScanJobWorkerPool:
+    """Fixed number of asyncio workers draining the scan_jobs table."""
+
+    def __init__(self):
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def start(self, workers: int):
+        if self._tasks or workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"scan-job-worker-{i}")
+            for i in range(workers)
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes idle workers in this process after a local enqueue."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait_for_work(self):
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=settings.scan_job_poll_interval_s
+            )
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                job_id = await run_in_threadpool(_claim_next_job_in_session)
+
+                if job_id is None:
+                    await self._wait_for_work()
+                    continue
+                await process_scan_job(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Scan job worker error")
+                await asyncio.sleep(settings.scan_job_poll_interval_s)
+
+
+scan_job_pool = ScanJobWorkerPool()
@@ -0,0 +1,446 @@
+"""Shared scan pipeline: S3 upload + vision analysis + meal log persistence."""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import SessionLocal
+from app.models import MealLog, User
+from app.schemas import FoodItem, ScanBatchItem, ScanResponse
+from app.services.admission import AdmissionRejectedError
+from app.services.image_processing import (
+    InvalidImageError,
+    NormalizedImage,
+    extension_for_content_type,
+)
+from app.services.scan_cache import scan_cache_key
+from app.services.single_flight import PostgresAdvisoryLock, run_single_flight
+from app.services.storage import upload_image, delete_image
+from app.services.url_helper import get_s3_url
+from app.services.vision import (
+    PlateAnalysis,
+    ScanEventCallback,
+    VisionUsage,
+    add_token_usage,
+    add_vision_records,
+    analyze_plate_cached,
+)
+from app.services.vision_parser import VisionParseError
+from app.services.vision_providers import get_vision_provider
+from app.services.vision_resilience import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+INSUFFICIENT_SCANS_DETAIL = "Insufficient scans available. Please wait for your daily reset or purchase more scans to continue."
+VISION_UNAVAILABLE_DETAIL = (
+    "Food recognition is temporarily unavailable. Please try again shortly."
+)
+
+
+async def discard_upload(upload_task: asyncio.Task, key: str):
+    """Waits for an in-flight S3 upload and deletes the object it created."""
+    try:
+        await upload_task
+    except Exception:
+        return  # Nothing was stored
+    try:
+        await run_in_threadpool(delete_image, key)
+    except Exception as e:
+        logger.warning(f"Could not delete orphaned upload {key}: {e}")
+
+
+async def run_scan(
+    db: Session,
+    user: User,
+    image_bytes: bytes,
+    content_type: str,
+    detail: str,
+    plate_size_cm: float | None = None,
+    on_event: Optional[ScanEventCallback] = None,
+    before_commit: Optional[Callable[[ScanResponse], None]] = None,
+) -> ScanResponse:
+    """
+    Analyzes an already-normalized image, stores it and saves the MealLog.
+    Decrements 1 scan on success. Callers check the scan balance first.
+    on_event receives the vision progress events (see analyze_plate_cached).
+    before_commit is called with the response just before the MealLog is
+    committed, so the caller can save its own changes in that transaction;
+    it is not called when the result comes from another caller's scan.
+
+    Identical scans (same user, image, plate size and detail) that arrive
+    while one is in flight attach to it instead of running again, so only
+    one credit and one MealLog are charged. SCAN_COALESCE_MODE picks
+    "local" (this process), "postgres" (advisory lock across workers,
+    experimental) or "off".
+    """
+    mode = settings.scan_coalesce_mode
+    if mode not in ("local", "postgres"):
+        return await _run_scan_once(
+            db,
+            user,
+            image_bytes,
+            content_type,
+            detail,
+            plate_size_cm,
+            on_event,
+            before_commit=before_commit,
+        )
+
+    content_hash = scan_cache_key(
+        image_bytes, plate_size_cm, get_vision_provider().model_name, detail
+    )
+    flight_key = f"scan:{user.id}:{content_hash}"
+
+    async def lead() -> ScanResponse:
+        if mode == "local":
+            return await _run_scan_once(
+                db,
+                user,
+                image_bytes,
+                content_type,
+                detail,
+                plate_size_cm,
+                on_event,
+                content_hash=content_hash,
+                before_commit=before_commit,
+            )
+
+        arrived_at = datetime.utcnow()
+        async with PostgresAdvisoryLock(db, flight_key) as lock:
+            if lock.waited:
+                # Another worker held the lock; reuse its result if it finished
+                existing = find_coalesced_scan(db, user, content_hash, arrived_at)
+                if existing is not None:
+                    return existing
+            return await _run_scan_once(
+                db,
+                user,
+                image_bytes,
+                content_type,
+                detail,
+                plate_size_cm,
+                on_event,
+                content_hash=content_hash,
+                before_commit=before_commit,
+            )
+
+    response, shared = await run_single_flight(flight_key, lead)
+    if shared:
+        response = response.model_copy(update={"coalesced": True})
+    return response
+
+
+def find_coalesced_scan(
+    db: Session, user: User, content_hash: str, since: datetime
+) -> Optional[ScanResponse]:
+    """Returns the scan another worker saved for this image after `since`."""
+    log = (
+        db.query(MealLog)
+        .filter(
+            MealLog.user_id == user.id,
+            MealLog.content_hash == content_hash,
+            MealLog.created_at >= since,
+        )
+        .order_by(MealLog.created_at.desc())
+        .first()
+    )
+    if log is None:
+        return None
+
+    db.refresh(user)
+    return ScanResponse(
+        items=log.items or [],
+        total_calories=log.total_calories,
+        photo_url=get_s3_url(log.photo_url),
+        scans_remaining=user.scans_remaining,
+        log_id=log.id,
+        coalesced=True,
+    )
+
+
+class ScanAnalysis(NamedTuple):
+    """Result of the analyze + upload stage, before anything is persisted."""
+
+    plate: PlateAnalysis
+    photo_key: str
+    plate_size_cm: Optional[float]
+    content_hash: Optional[str]
+
+    @property
+    def items(self) -> List[FoodItem]:
+        return self.plate.items
+
+
+async def analyze_and_upload(
+    db: Session,
+    user: User,
+    image_bytes: bytes,
+    content_type: str,
+    detail: str,
+    plate_size_cm: float | None = None,
+    on_event: Optional[ScanEventCallback] = None,
+    content_hash: Optional[str] = None,
+) -> ScanAnalysis:
+    """
+    Analyzes the plate while the image uploads to S3 in a worker thread.
+    Writes nothing to db. The token usage of a call whose output could not
+    be parsed, and the usage and cache entry of an analysis whose upload
+    failed, are committed in separate sessions.
+    """
+    key = f"uploads/{uuid.uuid4().hex}.{extension_for_content_type(content_type)}"
+    upload_task = asyncio.create_task(
+        run_in_threadpool(upload_image, key, image_bytes, content_type)
+    )
+
+    # Analyze plate (identical resubmits are served from the scan cache)
+    try:
+        plate = await analyze_plate_cached(
+            image_bytes,
+            plate_size_cm=plate_size_cm,
+            db=db,
+            detail=detail,
+            mime_type=content_type,
+            on_event=on_event,
+            user_id=user.id,
+        )
+    except BaseException as e:
+        # Also covers client disconnects (CancelledError)
+        await asyncio.shield(discard_upload(upload_task, key))
+        if isinstance(e, VisionParseError) and e.usage is not None:
+            await run_in_threadpool(record_failed_usage, user.id, e.usage)
+        if isinstance(e, CircuitOpenError):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=VISION_UNAVAILABLE_DETAIL,
+                headers={"Retry-After": str(e.retry_after)},
+            ) from e
+        if isinstance(e, AdmissionRejectedError):
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)},
+            ) from e
+        raise
+
+    try:
+        photo_key = await upload_task
+    except Exception:
+        # The analysis was paid for: keep its usage and cache entry so a
+        # retry of the same image is served from the scan cache
+        await run_in_threadpool(record_unsaved_analysis, user.id, plate)
+        raise
+    return ScanAnalysis(plate, photo_key, plate_size_cm, content_hash)
+
+
+def record_failed_usage(user_id: int, usage: VisionUsage):
+    """
+    Tokens are billed even when the output is unusable, so log them. Uses a
+    session of its own: the caller's may be shared by the concurrent scans
+    of a batch, which commits once at the end.
+    """
+    db = SessionLocal()
+    try:
+        add_token_usage(db, user_id, usage)
+        db.commit()
+    except Exception as e:
+        # Don't mask the original failure
+        logger.warning(f"Failed to log token usage: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def record_unsaved_analysis(user_id: int, plate: PlateAnalysis):
+    """
+    Commits the usage and cache entry of an analysis whose scan failed, in
+    a session of its own like record_failed_usage.
+    """
+    db = SessionLocal()
+    try:
+        add_vision_records(db, user_id, plate)
+        db.commit()
+    except Exception as e:
+        # Don't mask the original failure
+        logger.warning(f"Failed to record usage of an unsaved scan: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def add_scan_log(db: Session, user: User, analysis: ScanAnalysis) -> MealLog:
+    """
+    Persistence stage: adds the TokenUsage row, scan cache entry, MealLog
+    and scan decrement to the session. The caller commits once.
+    """
+    add_vision_records(db, user.id, analysis.plate)
+
+    total_calories = sum(i.calories or 0 for i in analysis.items)
+    log = MealLog(
+        user_id=user.id,
+        created_at=datetime.utcnow(),
+        total_calories=round(total_calories, -1),
+        photo_url=analysis.photo_key,
+        items=[item.model_dump() for item in analysis.items],
+        plate_size_cm=analysis.plate_size_cm,
+        content_hash=analysis.content_hash,
+    )
+    db.add(log)
+    user.scans_remaining -= 1
+    return log
+
+
+def build_scan_response(
+    analysis: ScanAnalysis, log_id: int, scans_remaining: int
+) -> ScanResponse:
+    return ScanResponse(
+        items=analysis.items,
+        total_calories=sum(i.calories or 0 for i in analysis.items),
+        photo_url=get_s3_url(analysis.photo_key),
+        scans_remaining=scans_remaining,
+        log_id=log_id,
+        cached=analysis.plate.cache_hit,
+    )
+
+
+async def _run_scan_once(
+    db: Session,
+    user: User,
+    image_bytes: bytes,
+    content_type: str,
+    detail: str,
+    plate_size_cm: float | None = None,
+    on_event: Optional[ScanEventCallback] = None,
+    content_hash: Optional[str] = None,
+    before_commit: Optional[Callable[[ScanResponse], None]] = None,
+) -> ScanResponse:
+    analysis = await analyze_and_upload(
+        db,
+        user,
+        image_bytes,
+        content_type,
+        detail,
+        plate_size_cm,
+        on_event,
+        content_hash=content_hash,
+    )
+
+    # Successfully processed and analyzed: one transaction for the token
+    # usage, cache entry, meal log and scan decrement
+    log = add_scan_log(db, user, analysis)
+    # Read generated values before commit expires them (no reload queries)
+    await run_in_threadpool(db.flush)
+    log_id, scans_remaining = log.id, user.scans_remaining
+    response = build_scan_response(analysis, log_id, scans_remaining)
+    if before_commit is not None:
+        before_commit(response)
+    await run_in_threadpool(db.commit)
+
+    return response
+
+
+async def run_scan_batch(
+    db: Session,
+    user: User,
+    images: List[NormalizedImage | InvalidImageError],
+    plate_size_cm: float | None = None,
+) -> List[ScanBatchItem]:
+    """
+    Analyzes several normalized images concurrently (at most
+    SCAN_BATCH_CONCURRENCY at once), then saves every successful MealLog
+    and the combined scan decrement in a single commit.
+    InvalidImageError entries (uploads that failed normalization) are
+    reported as per-image 400 errors. Repeated images are scanned once.
+    """
+    concurrency = settings.scan_batch_concurrency
+    if settings.admission_mode != "off":
+        # More would be rejected by the per-user admission limit
+        concurrency = min(concurrency, settings.admission_max_concurrent_per_user)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def analyze(image: NormalizedImage, content_hash: str) -> ScanAnalysis:
+        async with semaphore:
+            return await analyze_and_upload(
+                db,
+                user,
+                image.data,
+                image.content_type,
+                image.detail,
+                plate_size_cm,
+                content_hash=content_hash,
+            )
+
+    # The same image sent twice in one batch is analyzed and charged once;
+    # its later indexes get the first one's result
+    indexed = []
+    duplicates: Dict[int, int] = {}  # index -> index of the first copy
+    first_by_hash: Dict[str, int] = {}
+    for i, image in enumerate(images):
+        if isinstance(image, InvalidImageError):
+            continue
+        content_hash = scan_cache_key(
+            image.data, plate_size_cm, get_vision_provider().model_name, image.detail
+        )
+        if content_hash in first_by_hash:
+            duplicates[i] = first_by_hash[content_hash]
+            continue
+        first_by_hash[content_hash] = i
+        indexed.append((i, image, content_hash))
+    outcomes = await asyncio.gather(
+        *(analyze(image, content_hash) for _, image, content_hash in indexed),
+        return_exceptions=True,
+    )
+
+    results = {
+        i: ScanBatchItem(index=i, status_code=400, error=str(image))
+        for i, image in enumerate(images)
+        if isinstance(image, InvalidImageError)
+    }
+    analyses = []
+    for (i, _, _), outcome in zip(indexed, outcomes):
+        if isinstance(outcome, HTTPException):
+            results[i] = ScanBatchItem(
+                index=i, status_code=outcome.status_code, error=str(outcome.detail)
+            )
+        elif isinstance(outcome, BaseException):
+            logger.error(f"Batch scan image {i} failed: {outcome!r}")
+            results[i] = ScanBatchItem(index=i, status_code=500, error="Scan failed")
+        else:
+            analyses.append((i, outcome))
+
+    # One transaction for every log and the combined balance change
+    logs = [
+        (i, analysis, add_scan_log(db, user, analysis)) for i, analysis in analyses
+    ]
+    log_ids = []
+    scans_remaining = user.scans_remaining
+    if logs:
+        try:
+            await run_in_threadpool(db.flush)
+            log_ids = [log.id for _, _, log in logs]
+            scans_remaining = user.scans_remaining
+            await run_in_threadpool(db.commit)
+        except Exception:
+            await run_in_threadpool(db.rollback)
+            for _, analysis, _ in logs:
+                await run_in_threadpool(delete_image, analysis.photo_key)
+            raise
+
+    for (i, analysis, _), log_id in zip(logs, log_ids):
+        results[i] = ScanBatchItem(
+            index=i,
+            status_code=200,
+            result=build_scan_response(analysis, log_id, scans_remaining),
+        )
+    for i, first in duplicates.items():
+        result = results[first].result
+        if result is not None:
+            result = result.model_copy(update={"coalesced": True})
+        results[i] = results[first].model_copy(update={"index": i, "result": result})
+    return [results[i] for i in range(len(images))]
@@ -0,0 +1,108 @@
+"""
+Request coalescing: identical concurrent work runs once and is shared.
+In-process via futures, across processes via Postgres advisory locks.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+T = TypeVar("T")
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def run_single_flight(
+    key: str, fn: Callable[[], Awaitable[T]]
+) -> Tuple[T, bool]:
+    """
+    Runs fn unless a call with the same key is already in flight in this
+    process, in which case its result is awaited instead.
+    Returns (result, shared); shared is True for callers that attached.
+    If the running caller is cancelled, a waiting caller takes over.
+    """
+    while True:
+        flight = _inflight.get(key)
+        if flight is None:
+            break
+        try:
+            return await asyncio.shield(flight), True
+        except asyncio.CancelledError:
+            if flight.cancelled():
+                continue  # Leader went away; retry as leader
+            raise
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        # Mark retrieved so an unobserved failure is not logged twice
+        future.exception()
+        raise
+    else:
+        future.set_result(result)
+        return result, False
+    finally:
+        _inflight.pop(key, None)
+
+
+def inflight_count() -> int:
+    return len(_inflight)
+
+
+def advisory_lock_id(key: str) -> int:
+    """Maps a string key onto Postgres' signed 64-bit advisory lock space."""
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class PostgresAdvisoryLock:
+    """
+    Transaction-level pg advisory lock taken on the caller's own session,
+    so no extra pooled connection is held for the duration of the scan.
+    The lock is released when that session's transaction ends: the commit
+    that saves the scan, or the rollback/close after a failure. Acquisition
+    polls pg_try_advisory_xact_lock rather than blocking a threadpool
+    thread. `acquired` is False if SCAN_COALESCE_WAIT_S elapsed first.
+    """
+
+    def __init__(self, db: Session, key: str):
+        self.db = db
+        self.lock_id = advisory_lock_id(key)
+        self.acquired = False
+        self.waited = False
+
+    def _try_lock(self) -> bool:
+        return bool(
+            self.db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": self.lock_id}
+            ).scalar()
+        )
+
+    async def __aenter__(self):
+        deadline = time.monotonic() + settings.scan_coalesce_wait_s
+        while True:
+            if await run_in_threadpool(self._try_lock):
+                self.acquired = True
+                break
+            self.waited = True
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(settings.scan_coalesce_poll_s)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # Released with the session's transaction, never explicitly
+        return None
@@ -1,6 +1,10 @@
 import io
 import logging
+import time
+from datetime import datetime, timezone
+
 import boto3
+import botocore.auth
 from botocore.config import Config
 from botocore.exceptions import ClientError, EndpointResolutionError
 from app.config import settings
@@ -19,6 +23,46 @@ s3 = boto3.client(
 )
 
 
+def presign_window_s() -> int:
+    """Signing window length, kept under half the URL lifetime."""
+    return max(1, min(settings.presign_window_s, settings.presign_expires_s // 2))
+
+
+def presign_window_start(now: float | None = None) -> int:
+    """Unix time at which the signing window containing now began."""
+    window = presign_window_s()
+    now = time.time() if now is None else now
+    return int(now // window) * window
+
+
+class WindowedS3SigV4QueryAuth(botocore.auth.S3SigV4QueryAuth):
+    """
+    SigV4 query signer that dates every signature at the start of the
+    current signing window instead of the current second, so presigning
+    the same key with the same lifetime yields the same URL for the whole
+    window (across requests and processes).
+    """
+
+    def _modify_request_before_signing(self, request):
+        signed_at = datetime.fromtimestamp(presign_window_start(), tz=timezone.utc)
+        request.context["timestamp"] = signed_at.strftime(botocore.auth.SIGV4_TIMESTAMP)
+        super()._modify_request_before_signing(request)
+
+
+# Used via the "-query" suffix botocore appends when presigning
+botocore.auth.AUTH_TYPE_MAPS["s3v4-window-query"] = WindowedS3SigV4QueryAuth
+
+# Only ever used to presign; API calls keep the regular s3v4 client
+presign_s3 = boto3.client(
+    "s3",
+    endpoint_url=settings.s3_endpoint_url,
+    aws_access_key_id=settings.s3_access_key,
+    aws_secret_access_key=settings.s3_secret_key,
+    region_name=settings.s3_region,
+    config=Config(signature_version="s3v4-window"),
+)
+
+
 def ensure_bucket():
     try:
         s3.head_bucket(Bucket=settings.s3_bucket)
@@ -41,15 +85,21 @@ def upload_image(key: str, data: bytes, content_type: str) -> str:
     return key
 
 
+def delete_image(key: str):
+    s3.delete_object(Bucket=settings.s3_bucket, Key=key)
+
+
 def generate_presigned_url(key: str, expiration: int = 3600) -> str:
     """
     Generate a presigned URL to share an S3 object securely.
+    The URL is signed at the start of the current signing window, so it is
+    valid for expiration seconds from then.
     :param key: The key of the object to share.
     :param expiration: Time in seconds for the presigned URL to remain valid.
     :return: Presigned URL as string.
     """
     try:
-        response = s3.generate_presigned_url(
+        response = presign_s3.generate_presigned_url(
             "get_object",
             Params={"Bucket": settings.s3_bucket, "Key": key},
             ExpiresIn=expiration,
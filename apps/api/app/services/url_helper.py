@@ -1,15 +1,66 @@
-"""Helper function to generate accessible URLs from S3 keys"""
+"""Helper functions to generate accessible URLs from S3 keys"""
+
+import time
+from typing import Dict, Iterable, List, Optional
 
 from app.config import settings
+from app.services.cache import MISS, TTLCache
+
+# Object key -> presigned URL, kept until its signing window ends
+presign_cache = TTLCache(
+    max_entries=settings.presign_cache_max_entries,
+    default_ttl_s=settings.presign_window_s,
+)
+
+
+def _presign(keys: List[str]) -> Dict[str, Optional[str]]:
+    """Presigned URLs of S3 keys, from the cache or freshly signed."""
+    from app.services.storage import (
+        generate_presigned_url,
+        presign_window_s,
+        presign_window_start,
+    )
+
+    urls = {}
+    for key in keys:
+        url = presign_cache.get(key)
+        if url is MISS:
+            # Cache until the window ends, when the next signature is dated
+            window_end = presign_window_start() + presign_window_s()
+            url = generate_presigned_url(key, expiration=settings.presign_expires_s)
+            if url is not None:
+                presign_cache.set(key, url, ttl_s=window_end - time.time())
+        urls[key] = url
+    return urls
 
 
 def get_s3_url(key: str | None) -> str | None:
     """Convert S3 key to a secure presigned URL"""
-    if not key:
-        return None
-    if key.startswith("http"):
-        return key  # Already a full URL (e.g., Google OAuth profile picture)
+    return get_s3_urls([key])[0]
+
+
+def get_s3_urls(keys: Iterable[str | None]) -> List[str | None]:
+    """get_s3_url for many keys at once (e.g. a page of meal logs)"""
+    keys = list(keys)
+    to_sign = [key for key in keys if key and not key.startswith("http")]
+    urls = _presign(list(dict.fromkeys(to_sign))) if to_sign else {}
+    results = []
+    for key in keys:
+        if not key:
+            results.append(None)
+        elif key.startswith("http"):
+            # Already a full URL (e.g., Google OAuth profile picture)
+            results.append(key)
+        else:
+            results.append(urls[key])
+    return results
+
 
-    from app.services.storage import generate_presigned_url
+def presign_cache_stats() -> dict:
+    from app.services.storage import presign_window_s, presign_window_start
 
-    return generate_presigned_url(key, expiration=3600)
+    stats = presign_cache.stats()
+    stats["window_s"] = presign_window_s()
+    stats["expires_s"] = settings.presign_expires_s
+    stats["window_start"] = presign_window_start()
+    return stats
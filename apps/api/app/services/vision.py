@@ -1,201 +1,255 @@
-import base64
-import json
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
 
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
 from sqlalchemy.orm import Session
 
-from app.config import settings
+from app.models import TokenUsage
 from app.schemas import FoodItem
 from app.services.nutrition import (
+    compute_portions_batch,
+    cooking_style_multiplier,
     normalize_food_name,
-    get_portion_grams,
-    get_usda_nutrition,
-    calculate_calories,
+    parse_portion,
+    get_usda_nutrition_batch,
 )
+from app.services.admission import AdmissionTicket, vision_admission
+from app.services.vision_parser import VisionParseError, parse_vision_response
+from app.services.scan_cache import (
+    scan_cache_key,
+    get_cached_vision_result,
+    add_vision_result,
+)
+from app.services.vision_providers import VisionUsage, get_vision_provider
+from app.services.vision_resilience import call_vision
+
+# Progress callback for streaming scans: (event name, JSON-able payload)
+ScanEventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
 
+class PlateAnalysis(NamedTuple):
+    """Output of the vision + nutrition stages; nothing is persisted yet."""
 
-async def analyze_plate(
+    items: List[FoodItem]
+    cache_hit: bool
+    usage: Optional[VisionUsage]  # None on a cache hit
+    cache_key: Optional[str]
+    vision_data: Dict[str, Any]  # Parsed model JSON, stored in the scan cache
+
+
+async def analyze_plate_cached(
     image_bytes: bytes,
     plate_size_cm: float | None = None,
-    user_id: Optional[int] = None,
     db: Optional[Session] = None,
-) -> List[FoodItem]:
-    if not settings.openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set")
-
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-    data_url = f"data:image/jpeg;base64,{image_b64}"
-
-    # Exact prompt requested by user
-    prompt = """
-            You are a food analysis AI.
-
-            Analyze the provided food image and follow ALL rules strictly:
-
-            1. Identify each distinct food item visible.
-            2. For each item:
-            - Provide a clear generic food name (lowercase).
-            - Estimate portion using STRICT numeric format only:
-                    "<number> cup"
-                    "<number> bowl"
-                    "<number> piece"
-                    "<number> tbsp"
-                    "<number> tsp"
-            - Do NOT use words like small, medium, large.
-            - Do NOT use ranges.
-            - Do NOT use fractions like 1/2. Use decimals (0.5).
-            3. Cooking style must be ONE of:
-            "fried", "steamed", "baked", "curry", null
-            4. If mixed dish (biryani, dal-chawal), treat as ONE dish.
-            5. Do NOT guess calories.
-            6. If unsure, lower confidence but still choose best estimate.
-            7. Assume the food is served on a standard 10-inch dinner plate unless a bowl is clearly visible.
-            8. Do NOT adjust portion size based solely on camera distance.
-
-            Return ONLY valid JSON.
-
-            Schema:
-            {
-            "foods": [
-                {
-                "name": string,
-                "portion": string,
-                "cooking_style": "fried" | "steamed" | "baked" | "curry" | null,
-                "confidence": number (0-1),
-                "notes": string | null
-                }
-            ],
-            "meal_notes": string | null
-            }
+    detail: str = "high",
+    mime_type: str = "image/jpeg",
+    on_event: Optional[ScanEventCallback] = None,
+    user_id: Optional[int] = None,
+) -> PlateAnalysis:
+    """
+    Vision + nutrition stages of a scan, consulting the scan result cache
+    first when a db session is given. A cache hit skips the LLM call and
+    so has no usage to record. The LLM call goes through vision_admission
+    (global token budget, per-user limit for user_id) and may raise
+    AdmissionRejectedError. Nothing is written to the database here;
+    pass the result to add_vision_records inside the caller's transaction.
+    on_event, if given, receives "identified" once the food list is known
+    and "item" for each FoodItem as its nutrition resolves.
+    """
+    cache_key = None
+    if db is not None:
+        cache_key = scan_cache_key(
+            image_bytes, plate_size_cm, get_vision_provider().model_name, detail
+        )
+        cached = get_cached_vision_result(db, cache_key)
+        if cached is not None:
+            if on_event:
+                await on_event("identified", identified_payload(cached, True))
+            items = await resolve_food_items(cached, on_event)
+            return PlateAnalysis(items, True, None, cache_key, cached)
+
+    async with vision_admission.admit(user_id) as ticket:
+        try:
+            data, usage = await identify_foods(
+                image_bytes,
+                plate_size_cm=plate_size_cm,
+                detail=detail,
+                mime_type=mime_type,
+                ticket=ticket,
+            )
+        except VisionParseError as e:
+            if e.usage is not None:
+                ticket.used_tokens = e.usage.total_tokens
+            raise
+        if usage is not None:
+            ticket.used_tokens = usage.total_tokens
+    if on_event:
+        await on_event("identified", identified_payload(data, False))
+    items = await resolve_food_items(data, on_event)
+    return PlateAnalysis(items, False, usage, cache_key, data)
+
+
+def add_vision_records(db: Session, user_id: int, analysis: PlateAnalysis):
     """
+    Adds the TokenUsage row and scan cache entry for a fresh analysis to
+    the session. Does not commit; the caller's transaction does.
+    """
+    if analysis.cache_hit:
+        return
+    if analysis.usage is not None:
+        add_token_usage(db, user_id, analysis.usage)
+    if analysis.cache_key is not None:
+        add_vision_result(
+            db,
+            analysis.cache_key,
+            get_vision_provider().model_name,
+            analysis.vision_data,
+        )
 
-    model = ChatOpenAI(
-        model=settings.ai_model,
-        api_key=settings.openai_api_key,
-        max_tokens=1500,
-        temperature=0,
-    )
-    message = HumanMessage(
-        content=[
-            {"type": "text", "text": prompt},
-            {"type": "image_url", "image_url": {"url": data_url, "detail": "high"}},
-        ]
-    )
 
-    response = await model.ainvoke([message])
-    raw = (
-        response.content if isinstance(response.content, str) else str(response.content)
+def add_token_usage(db: Session, user_id: int, usage: VisionUsage):
+    db.add(
+        TokenUsage(
+            user_id=user_id,
+            model_name=usage.model_name,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+            estimated_cost_usd=usage.estimated_cost_usd,
+            endpoint="/scan",
+        )
     )
 
-    # Log token usage to database
-    if user_id and db:
-        try:
-            from app.models import TokenUsage
-
-            # Extract usage information from response
-            usage_metadata = getattr(response, "usage_metadata", None) or getattr(
-                response, "response_metadata", {}
-            ).get("token_usage", {})
-
-            if usage_metadata:
-                input_tokens = usage_metadata.get(
-                    "input_tokens", 0
-                ) or usage_metadata.get("prompt_tokens", 0)
-                output_tokens = usage_metadata.get(
-                    "output_tokens", 0
-                ) or usage_metadata.get("completion_tokens", 0)
-                total_tokens = getattr(
-                    usage_metadata, "total_tokens", 0
-                ) or usage_metadata.get("total_tokens", input_tokens + output_tokens)
-
-                # Calculate cost based on GPT-4o-mini pricing
-                # https://openai.com/api/pricing/
-                # Input: $0.150 / 1M tokens
-                # Output: $0.600 / 1M tokens
-                input_cost = (input_tokens / 1_000_000) * 0.150
-                output_cost = (output_tokens / 1_000_000) * 0.600
-                total_cost = input_cost + output_cost
-
-                # Create token usage record
-                token_record = TokenUsage(
-                    user_id=user_id,
-                    model_name=settings.ai_model,
-                    input_tokens=input_tokens,
-                    output_tokens=output_tokens,
-                    total_tokens=total_tokens,
-                    estimated_cost_usd=round(total_cost, 6),
-                    endpoint="/scan",
-                )
-                db.add(token_record)
-                db.commit()
-        except Exception as e:
-            # Don't fail the request if logging fails
-            print(f"Warning: Failed to log token usage: {e}")
-            db.rollback() if db else None
 
+def identified_payload(data: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+    """Names and portions straight from the vision JSON, before nutrition."""
+    return {
+        "items": [
+            {
+                "index": index,
+                "name": item.get("name", "Unknown"),
+                "portion": item.get("portion"),
+                "cooking_style": item.get("cooking_style"),
+                "confidence": item.get("confidence"),
+            }
+            for index, item in enumerate(data.get("foods", []))
+        ],
+        "meal_notes": data.get("meal_notes"),
+        "cached": cached,
+    }
+
+
+async def identify_foods(
+    image_bytes: bytes,
+    plate_size_cm: float | None = None,
+    detail: str = "high",
+    mime_type: str = "image/jpeg",
+    ticket: Optional[AdmissionTicket] = None,
+) -> Tuple[Dict[str, Any], Optional[VisionUsage]]:
+    """
+    Runs the configured vision provider. Raises CircuitOpenError without
+    calling it while the circuit breaker is open. Returns its parsed
+    foods/meal_notes JSON and the token usage. If the output cannot be
+    parsed, the raised VisionParseError carries the usage so the billed
+    tokens can still be recorded. With an admission ticket, a hedged
+    attempt is only sent if its tokens can be reserved, and a losing
+    attempt is charged to the ticket.
+    """
+    provider = get_vision_provider()
+    hooks = {}
+    if ticket is not None:
+        hooks = {
+            "reserve_hedge": lambda: vision_admission.reserve_hedge(ticket),
+            "on_abandoned": ticket.abandon,
+        }
+    # Hedged against slow completions, behind the circuit breaker
+    completion = await call_vision(
+        lambda: provider.complete(image_bytes, detail, mime_type), **hooks
+    )
+
+    # Validated parse, salvaging complete items from truncated output
     try:
-        # Clean potential markdown fences
-        clean_raw = raw.strip()
-        if clean_raw.startswith("```json"):
-            clean_raw = clean_raw[7:]
-        if clean_raw.endswith("```"):
-            clean_raw = clean_raw[:-3]
-
-        data = json.loads(clean_raw)
-    except json.JSONDecodeError:
-        # Fallback extraction
-        start = raw.find("{")
-        end = raw.rfind("}")
-        if start != -1 and end != -1:
-            data = json.loads(raw[start : end + 1])
-        else:
-            raise ValueError("Failed to parse GPT response")
-
-    items = []
-    for item in data.get("foods", []):
-        raw_name = item.get("name", "Unknown")
-        portion_str = item.get("portion")
-        cooking_style = item.get("cooking_style")
-        notes = item.get("notes")
-
-        # 1. Normalize Name
-        normalized_name = normalize_food_name(raw_name)
-
-        # 2. Get USDA Nutrition (kcal, protein, carbs, fat per 100g)
-        nutrition = await get_usda_nutrition(normalized_name)
-        kcal_per_100g = nutrition["kcal"]
-
-        # 3. Get Grams
-        # grams = get_portion_grams(portion_str)
-        grams = get_portion_grams(
-            normalized_name,
-            item["portion"],
-            nutrition.get("serving_grams"),
-        )
+        analysis = parse_vision_response(completion.raw, provider.model_name)
+    except VisionParseError as e:
+        e.usage = completion.usage
+        raise
 
-        # 4. Calculate Total Calories and Macros
-        total_kcal = calculate_calories(grams, kcal_per_100g, cooking_style)
-
-        # Scale macros based on grams
-        scale = grams / 100.0
-        protein = round(nutrition["protein"] * scale, 1)
-        carbs = round(nutrition["carbs"] * scale, 1)
-        fat = round(nutrition["fat"] * scale, 1)
-
-        items.append(
-            FoodItem(
-                name=raw_name,
-                normalized_name=normalized_name,
-                portion=portion_str,
-                estimated_grams=grams,
-                calories=total_kcal,
-                confidence=item.get("confidence"),
-                notes=notes,
-                protein_g=protein,
-                carbs_g=carbs,
-                fat_g=fat,
-            )
+    return analysis.model_dump(), completion.usage
+
+
+async def resolve_food_items(
+    data: Dict[str, Any], on_event: Optional[ScanEventCallback] = None
+) -> List[FoodItem]:
+    """Nutrition stage: turns the vision JSON into priced FoodItems."""
+    foods = data.get("foods", [])
+    normalized_names = [
+        normalize_food_name(item.get("name", "Unknown")) for item in foods
+    ]
+    if not on_event:
+        nutritions = await get_usda_nutrition_batch(normalized_names)
+        return build_food_items(foods, normalized_names, nutritions)
+
+    items: List[Optional[FoodItem]] = [None] * len(foods)
+
+    async def on_nutrition(index: int, nutrition: Dict[str, Any]):
+        items[index] = build_food_item(
+            foods[index], normalized_names[index], nutrition
         )
+        await on_event("item", {"index": index, "item": items[index].model_dump()})
+
+    await get_usda_nutrition_batch(normalized_names, on_nutrition)
     return items
+
+
+def build_food_item(
+    item: Dict[str, Any], normalized_name: str, nutrition: Dict[str, Any]
+) -> FoodItem:
+    """Turns one LLM food entry plus its per-100g nutrition into a FoodItem."""
+    return build_food_items([item], [normalized_name], [nutrition])[0]
+
+
+def build_food_items(
+    foods: List[Dict[str, Any]],
+    normalized_names: List[str],
+    nutritions: List[Dict[str, Any]],
+) -> List[FoodItem]:
+    """
+    Batch form of build_food_item: grams, calories and macros of every item
+    are computed together by compute_portions_batch.
+    """
+    portions = [
+        parse_portion(name, item["portion"], nutrition.get("serving_grams"))
+        for item, name, nutrition in zip(foods, normalized_names, nutritions)
+    ]
+    batch = compute_portions_batch(
+        quantities=[quantity for quantity, _ in portions],
+        grams_per_unit=[grams for _, grams in portions],
+        kcal_per_100g=[n["kcal"] for n in nutritions],
+        protein_per_100g=[n["protein"] for n in nutritions],
+        carbs_per_100g=[n["carbs"] for n in nutritions],
+        fat_per_100g=[n["fat"] for n in nutritions],
+        multipliers=[cooking_style_multiplier(f.get("cooking_style")) for f in foods],
+    )
+
+    return [
+        FoodItem(
+            name=item.get("name", "Unknown"),
+            normalized_name=name,
+            portion=item.get("portion"),
+            cooking_style=item.get("cooking_style"),
+            estimated_grams=grams,
+            calories=kcal,
+            confidence=item.get("confidence"),
+            notes=item.get("notes"),
+            protein_g=protein,
+            carbs_g=carbs,
+            fat_g=fat,
+        )
+        for item, name, grams, kcal, protein, carbs, fat in zip(
+            foods,
+            normalized_names,
+            batch.grams.tolist(),
+            batch.kcal.tolist(),
+            batch.protein.tolist(),
+            batch.carbs.tolist(),
+            batch.fat.tolist(),
+        )
+    ]
@@ -0,0 +1,148 @@
+"""Strict parsing of vision model output into VisionAnalysis objects."""
+
+import json
+import threading
+from collections import Counter
+from typing import Any, Dict
+
+from pydantic import ValidationError
+
+from app.schemas import VisionAnalysis
+
+# JSON schema sent with VISION_STRUCTURED_OUTPUT=true; mirrors VisionAnalysis
+VISION_RESPONSE_SCHEMA = {
+    "name": "plate_analysis",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["foods", "meal_notes"],
+        "properties": {
+            "foods": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": [
+                        "name",
+                        "portion",
+                        "cooking_style",
+                        "confidence",
+                        "notes",
+                    ],
+                    "properties": {
+                        "name": {"type": "string"},
+                        "portion": {"type": "string"},
+                        "cooking_style": {
+                            "type": ["string", "null"],
+                            "enum": ["fried", "steamed", "baked", "curry", None],
+                        },
+                        "confidence": {"type": "number"},
+                        "notes": {"type": ["string", "null"]},
+                    },
+                },
+            },
+            "meal_notes": {"type": ["string", "null"]},
+        },
+    },
+}
+
+_decoder = json.JSONDecoder()
+_lock = threading.Lock()
+
+# Per-model parse outcomes, exposed through /admin/vision-parse-stats
+parse_failures: Counter = Counter()
+parse_salvaged: Counter = Counter()
+
+
+class VisionParseError(ValueError):
+    """Raised when no usable foods can be recovered from the model output."""
+
+    # Token usage of the failed call, set by identify_foods
+    usage = None
+
+
+def _strip_fences(raw: str) -> str:
+    text = raw.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text.startswith("json"):
+            text = text[4:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _salvage_foods(text: str) -> Dict[str, Any]:
+    """
+    Recovers every complete food object from a truncated response, e.g.
+    output cut off by max_tokens halfway through the foods array.
+    """
+    key = text.find('"foods"')
+    start = text.find("[", key) if key != -1 else -1
+    if start == -1:
+        raise VisionParseError("No foods array in model output")
+
+    foods = []
+    pos = start + 1
+    while pos < len(text):
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] != "{":
+            break
+        try:
+            food, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break  # Truncated inside this object
+        foods.append(food)
+
+    if not foods:
+        raise VisionParseError("No complete food entries in model output")
+    return {"foods": foods, "meal_notes": None}
+
+
+def parse_vision_response(raw: str, model_name: str) -> VisionAnalysis:
+    """
+    Parses and validates model output. Tries strict JSON first, then the
+    outermost {...} span, then salvages complete food entries from a
+    truncated response. Raises VisionParseError if nothing is usable.
+    """
+    text = _strip_fences(raw)
+    salvaged = False
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        start = text.find("{")
+        end = text.rfind("}")
+        try:
+            if start == -1 or end <= start:
+                raise json.JSONDecodeError("No JSON object", text, 0)
+            data = json.loads(text[start : end + 1])
+        except json.JSONDecodeError:
+            try:
+                data = _salvage_foods(text)
+                salvaged = True
+            except VisionParseError:
+                with _lock:
+                    parse_failures[model_name] += 1
+                raise
+
+    try:
+        analysis = VisionAnalysis.model_validate(data)
+    except ValidationError as e:
+        with _lock:
+            parse_failures[model_name] += 1
+        raise VisionParseError(f"Model output does not match schema: {e}") from e
+
+    if salvaged:
+        with _lock:
+            parse_salvaged[model_name] += 1
+    return analysis
+
+
+def parse_stats() -> Dict[str, Dict[str, int]]:
+    with _lock:
+        return {
+            "failures": dict(parse_failures),
+            "salvaged": dict(parse_salvaged),
+        }
@@ -0,0 +1,357 @@
+"""
+Vision backends behind identify_foods, selected by VISION_PROVIDER:
+"openai" (live API), "fake" (fixture JSON, no network), "record" (live
+API, every response saved to VISION_RECORDINGS_DIR) or "replay" (serves
+saved responses only).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from langchain_core.messages import HumanMessage
+
+from app.config import settings
+from app.services.llm_client import get_vision_model
+
+logger = logging.getLogger(__name__)
+
+# Exact prompt requested by user
+VISION_PROMPT = """
+            You are a food analysis AI.
+
+            Analyze the provided food image and follow ALL rules strictly:
+
+            1. Identify each distinct food item visible.
+            2. For each item:
+            - Provide a clear generic food name (lowercase).
+            - Estimate portion using STRICT numeric format only:
+                    "<number> cup"
+                    "<number> bowl"
+                    "<number> piece"
+                    "<number> tbsp"
+                    "<number> tsp"
+            - Do NOT use words like small, medium, large.
+            - Do NOT use ranges.
+            - Do NOT use fractions like 1/2. Use decimals (0.5).
+            3. Cooking style must be ONE of:
+            "fried", "steamed", "baked", "curry", null
+            4. If mixed dish (biryani, dal-chawal), treat as ONE dish.
+            5. Do NOT guess calories.
+            6. If unsure, lower confidence but still choose best estimate.
+            7. Assume the food is served on a standard 10-inch dinner plate unless a bowl is clearly visible.
+            8. Do NOT adjust portion size based solely on camera distance.
+
+            Return ONLY valid JSON.
+
+            Schema:
+            {
+            "foods": [
+                {
+                "name": string,
+                "portion": string,
+                "cooking_style": "fried" | "steamed" | "baked" | "curry" | null,
+                "confidence": number (0-1),
+                "notes": string | null
+                }
+            ],
+            "meal_notes": string | null
+            }
+    """
+
+# Built once; every scan sends the same text part ahead of its image
+VISION_PROMPT_PART = {"type": "text", "text": VISION_PROMPT}
+
+# Served by the fake provider when VISION_FAKE_FIXTURE_PATH is not set
+DEFAULT_FAKE_RESPONSE: Dict[str, Any] = {
+    "foods": [
+        {
+            "name": "white rice",
+            "portion": "1 cup",
+            "cooking_style": "steamed",
+            "confidence": 0.9,
+            "notes": None,
+        },
+        {
+            "name": "dal",
+            "portion": "1 bowl",
+            "cooking_style": "curry",
+            "confidence": 0.85,
+            "notes": None,
+        },
+        {
+            "name": "chapati",
+            "portion": "2 piece",
+            "cooking_style": None,
+            "confidence": 0.8,
+            "notes": None,
+        },
+    ],
+    "meal_notes": None,
+}
+
+
+class VisionUsage(NamedTuple):
+    """Token usage of one vision call, priced for a TokenUsage row."""
+
+    model_name: str
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    estimated_cost_usd: float
+
+
+class VisionCompletion(NamedTuple):
+    """Raw model text (parsed by vision_parser) and its token usage."""
+
+    raw: str
+    usage: Optional[VisionUsage]
+
+
+class VisionRecordingMissingError(LookupError):
+    """Raised in replay mode for an image with no saved recording."""
+
+
+def price_usage(
+    model_name: str,
+    input_tokens: int,
+    output_tokens: int,
+    total_tokens: Optional[int] = None,
+) -> VisionUsage:
+    # Calculate cost based on GPT-4o-mini pricing
+    # https://openai.com/api/pricing/
+    # Input: $0.150 / 1M tokens
+    # Output: $0.600 / 1M tokens
+    input_cost = (input_tokens / 1_000_000) * 0.150
+    output_cost = (output_tokens / 1_000_000) * 0.600
+    total_cost = input_cost + output_cost
+
+    return VisionUsage(
+        model_name=model_name,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        total_tokens=total_tokens or input_tokens + output_tokens,
+        estimated_cost_usd=round(total_cost, 6),
+    )
+
+
+def extract_usage(response) -> Optional[VisionUsage]:
+    """Reads token counts from an LLM response and prices them."""
+    usage_metadata = getattr(response, "usage_metadata", None) or getattr(
+        response, "response_metadata", {}
+    ).get("token_usage", {})
+    if not usage_metadata:
+        return None
+
+    input_tokens = usage_metadata.get("input_tokens", 0) or usage_metadata.get(
+        "prompt_tokens", 0
+    )
+    output_tokens = usage_metadata.get("output_tokens", 0) or usage_metadata.get(
+        "completion_tokens", 0
+    )
+    total_tokens = usage_metadata.get("total_tokens", 0)
+    return price_usage(settings.ai_model, input_tokens, output_tokens, total_tokens)
+
+
+class VisionProvider(ABC):
+    """Turns a plate image into raw vision model output."""
+
+    name = "base"
+
+    @property
+    def model_name(self) -> str:
+        """Recorded on TokenUsage rows and part of the scan cache key."""
+        return settings.ai_model
+
+    @abstractmethod
+    async def complete(
+        self, image_bytes: bytes, detail: str = "high", mime_type: str = "image/jpeg"
+    ) -> VisionCompletion:
+        """Runs the vision call for one image."""
+
+
+class OpenAIVisionProvider(VisionProvider):
+    """The live OpenAI model via the shared ChatOpenAI client."""
+
+    name = "openai"
+
+    async def complete(
+        self, image_bytes: bytes, detail: str = "high", mime_type: str = "image/jpeg"
+    ) -> VisionCompletion:
+        if not settings.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set")
+
+        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+        data_url = f"data:{mime_type};base64,{image_b64}"
+
+        model = get_vision_model(structured=settings.vision_structured_output)
+        message = HumanMessage(
+            content=[
+                VISION_PROMPT_PART,
+                {"type": "image_url", "image_url": {"url": data_url, "detail": detail}},
+            ]
+        )
+
+        response = await model.ainvoke([message])
+        raw = (
+            response.content
+            if isinstance(response.content, str)
+            else str(response.content)
+        )
+        return VisionCompletion(raw, extract_usage(response))
+
+
+class FakeVisionProvider(VisionProvider):
+    """
+    Deterministic stand-in for load tests and benchmarks. Serves fixture
+    JSON (one response, or a list picked by image hash) after
+    VISION_FAKE_LATENCY_MS plus up to VISION_FAKE_LATENCY_JITTER_MS,
+    also derived from the image hash, and reports fixed token counts.
+    """
+
+    name = "fake"
+
+    def __init__(self, fixture_path: Optional[str] = None):
+        self.responses = self._load_fixtures(fixture_path)
+
+    @staticmethod
+    def _load_fixtures(path: Optional[str]) -> List[str]:
+        if not path:
+            return [json.dumps(DEFAULT_FAKE_RESPONSE)]
+        with open(path, "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixtures = fixture if isinstance(fixture, list) else [fixture]
+        if not fixtures:
+            raise ValueError(f"Vision fixture file {path} is empty")
+        # Strings are served verbatim, e.g. deliberately truncated output
+        return [f if isinstance(f, str) else json.dumps(f) for f in fixtures]
+
+    @property
+    def model_name(self) -> str:
+        return settings.vision_fake_model_name
+
+    async def complete(
+        self, image_bytes: bytes, detail: str = "high", mime_type: str = "image/jpeg"
+    ) -> VisionCompletion:
+        seed = int.from_bytes(hashlib.sha256(image_bytes).digest()[:8], "big")
+        latency_ms = settings.vision_fake_latency_ms
+        if settings.vision_fake_latency_jitter_ms > 0:
+            latency_ms += seed % (settings.vision_fake_latency_jitter_ms + 1)
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+        usage = price_usage(
+            self.model_name,
+            settings.vision_fake_input_tokens,
+            settings.vision_fake_output_tokens,
+        )
+        return VisionCompletion(self.responses[seed % len(self.responses)], usage)
+
+
+class RecordingVisionProvider(VisionProvider):
+    """
+    Record mode calls the live provider and saves each response as
+    <key>.json in VISION_RECORDINGS_DIR, keyed by image, detail level and
+    model. Replay mode serves only saved responses, sleeping for the
+    recorded latency when VISION_REPLAY_REALTIME is true.
+    """
+
+    def __init__(
+        self,
+        recordings_dir: str,
+        record: bool,
+        live: Optional[VisionProvider] = None,
+    ):
+        self.recordings_dir = recordings_dir
+        self.record = record
+        self.live = live or OpenAIVisionProvider()
+        self.name = "record" if record else "replay"
+
+    def recording_path(self, image_bytes: bytes, detail: str) -> str:
+        digest = hashlib.sha256(image_bytes)
+        digest.update(b"\0")
+        digest.update(detail.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.model_name.encode("utf-8"))
+        return os.path.join(self.recordings_dir, f"{digest.hexdigest()}.json")
+
+    async def complete(
+        self, image_bytes: bytes, detail: str = "high", mime_type: str = "image/jpeg"
+    ) -> VisionCompletion:
+        path = self.recording_path(image_bytes, detail)
+        if self.record:
+            return await self._record(path, image_bytes, detail, mime_type)
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                recording = json.load(f)
+        except FileNotFoundError:
+            raise VisionRecordingMissingError(
+                f"No vision recording for this image ({os.path.basename(path)})"
+            ) from None
+
+        if settings.vision_replay_realtime and recording.get("latency_ms"):
+            await asyncio.sleep(recording["latency_ms"] / 1000)
+        usage = recording.get("usage")
+        return VisionCompletion(
+            recording["raw"], VisionUsage(**usage) if usage else None
+        )
+
+    async def _record(
+        self, path: str, image_bytes: bytes, detail: str, mime_type: str
+    ) -> VisionCompletion:
+        started = time.perf_counter()
+        completion = await self.live.complete(image_bytes, detail, mime_type)
+        recording = {
+            "model_name": self.model_name,
+            "detail": detail,
+            "recorded_at": datetime.utcnow().isoformat(),
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "raw": completion.raw,
+            "usage": completion.usage._asdict() if completion.usage else None,
+        }
+        try:
+            os.makedirs(self.recordings_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(recording, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save vision recording {path}: {e}")
+        return completion
+
+
+_provider: Optional[VisionProvider] = None
+
+
+def create_vision_provider(name: str) -> VisionProvider:
+    if name == "openai":
+        return OpenAIVisionProvider()
+    if name == "fake":
+        return FakeVisionProvider(settings.vision_fake_fixture_path or None)
+    if name in ("record", "replay"):
+        return RecordingVisionProvider(
+            settings.vision_recordings_dir, record=name == "record"
+        )
+    raise ValueError(f"Unknown VISION_PROVIDER: {name!r}")
+
+
+def get_vision_provider() -> VisionProvider:
+    """Returns the process-wide provider chosen by VISION_PROVIDER."""
+    global _provider
+    if _provider is None:
+        _provider = create_vision_provider(settings.vision_provider)
+    return _provider
+
+
+def set_vision_provider(provider: Optional[VisionProvider]):
+    """Overrides the provider (None resets to VISION_PROVIDER)."""
+    global _provider
+    _provider = provider
@@ -0,0 +1,289 @@
+"""
+Latency hedging and circuit breaking around vision provider calls.
+
+A call that has not answered after a percentile of recent latencies gets a
+second, identical request; whichever succeeds first is used and the other
+is cancelled. When the recent error rate crosses a threshold the breaker
+opens and calls fail fast until a probe succeeds.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the vision model while the breaker is open."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Vision model circuit breaker is open")
+        self.retry_after = retry_after
+
+
+class LatencyWindow:
+    """The most recent successful call durations, for percentile estimates."""
+
+    def __init__(self, size: int):
+        self._samples: Deque[float] = deque(maxlen=max(1, size))
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when, over the last VISION_BREAKER_WINDOW_S, at least
+    VISION_BREAKER_MIN_CALLS calls were made and the failure share reached
+    VISION_BREAKER_FAILURE_RATE. After VISION_BREAKER_OPEN_S it lets
+    VISION_BREAKER_HALF_OPEN_PROBES calls through: a success closes it,
+    a failure re-opens it.
+    """
+
+    def __init__(self):
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._probes_in_flight = 0
+        self.opened_count = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == "open"
+            and time.monotonic() - self._opened_at >= settings.vision_breaker_open_s
+        ):
+            self._state = "half_open"
+            self._probes_in_flight = 0
+            logger.info("Vision circuit breaker half-open, probing")
+        return self._state
+
+    def retry_after(self) -> int:
+        remaining = self._opened_at + settings.vision_breaker_open_s - time.monotonic()
+        return max(1, math.ceil(remaining))
+
+    def before_call(self) -> bool:
+        """Raises CircuitOpenError if the call may not proceed; True for probes."""
+        if not settings.vision_breaker_enabled:
+            return False
+        state = self.state
+        if state == "open" or (
+            state == "half_open"
+            and self._probes_in_flight >= settings.vision_breaker_half_open_probes
+        ):
+            self.rejected += 1
+            raise CircuitOpenError(self.retry_after())
+        if state == "half_open":
+            self._probes_in_flight += 1
+            return True
+        return False
+
+    def release_probe(self):
+        self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def record(self, ok: bool):
+        if not settings.vision_breaker_enabled:
+            return
+        now = time.monotonic()
+        state = self.state
+        if state == "half_open":
+            if ok:
+                self._close()
+            else:
+                self._open(now)
+            return
+        if state == "open":
+            return  # Late result of a call started before the breaker opened
+
+        self._outcomes.append((now, ok))
+        self._trim(now)
+        calls = len(self._outcomes)
+        failures = sum(1 for _, success in self._outcomes if not success)
+        if (
+            not ok
+            and calls >= settings.vision_breaker_min_calls
+            and failures / calls >= settings.vision_breaker_failure_rate
+        ):
+            self._open(now)
+
+    def _trim(self, now: float):
+        cutoff = now - settings.vision_breaker_window_s
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def _open(self, now: float):
+        self._state = "open"
+        self._opened_at = now
+        self._outcomes.clear()
+        self.opened_count += 1
+        logger.warning(
+            f"Vision circuit breaker opened for {settings.vision_breaker_open_s}s"
+        )
+
+    def _close(self):
+        self._state = "closed"
+        self._outcomes.clear()
+        self._probes_in_flight = 0
+        logger.info("Vision circuit breaker closed")
+
+    def stats(self) -> Dict:
+        state = self.state
+        self._trim(time.monotonic())
+        calls = len(self._outcomes)
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return {
+            "enabled": settings.vision_breaker_enabled,
+            "state": state,
+            "window_calls": calls,
+            "window_failure_rate": round(failures / calls, 3) if calls else 0.0,
+            "opened_count": self.opened_count,
+            "rejected": self.rejected,
+            "retry_after_s": self.retry_after() if state == "open" else None,
+        }
+
+
+circuit_breaker = CircuitBreaker()
+latencies = LatencyWindow(settings.vision_latency_window)
+# Whether each recent call was hedged, for the VISION_HEDGE_MAX_RATIO budget
+_recent_hedges: Deque[bool] = deque(maxlen=max(1, settings.vision_latency_window))
+hedge_counts: Counter = Counter()
+
+
+def hedge_delay() -> Optional[float]:
+    """
+    Seconds to wait before hedging: the VISION_HEDGE_PERCENTILE of recent
+    latencies, clamped to [VISION_HEDGE_MIN_DELAY_S, VISION_HEDGE_MAX_DELAY_S].
+    Until VISION_HEDGE_MIN_SAMPLES calls have succeeded the max is used.
+    None when hedging is disabled.
+    """
+    if not settings.vision_hedge_enabled:
+        return None
+    if len(latencies) < settings.vision_hedge_min_samples:
+        return settings.vision_hedge_max_delay_s
+    delay = latencies.percentile(settings.vision_hedge_percentile)
+    return min(
+        max(delay, settings.vision_hedge_min_delay_s), settings.vision_hedge_max_delay_s
+    )
+
+
+def _hedge_budget_left() -> bool:
+    if not _recent_hedges:
+        return True
+    return sum(_recent_hedges) / len(_recent_hedges) < settings.vision_hedge_max_ratio
+
+
+async def call_vision(
+    fn: Callable[[], Awaitable[T]],
+    reserve_hedge: Optional[Callable[[], Awaitable[bool]]] = None,
+    on_abandoned: Optional[Callable[[int], None]] = None,
+) -> T:
+    """
+    Runs fn (one vision request) behind the circuit breaker, hedging it
+    with a second fn() if it is slower than hedge_delay(). The first
+    successful result wins; an error is raised only if every attempt fails.
+    reserve_hedge is awaited before a hedge fires and may veto it (e.g. no
+    token budget left). Token usage of a cancelled attempt is not reported
+    by the API, so on_abandoned is called with the number of attempts
+    cancelled in flight, to charge them as estimated.
+    """
+    is_probe = circuit_breaker.before_call()
+
+    async def attempt() -> T:
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            circuit_breaker.record(False)
+            raise
+        latencies.add(time.monotonic() - started)
+        circuit_breaker.record(True)
+        return result
+
+    hedged = False
+    primary = asyncio.create_task(attempt())
+    tasks = [primary]
+    try:
+        hedge_counts["calls"] += 1
+        delay = None if is_probe else hedge_delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if (
+                    _hedge_budget_left()
+                    and circuit_breaker.state == "closed"
+                    and (reserve_hedge is None or await reserve_hedge())
+                ):
+                    hedged = True
+                    hedge_counts["fired"] += 1
+                    tasks.append(asyncio.create_task(attempt()))
+                else:
+                    hedge_counts["skipped"] += 1
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        hedge_counts["won"] += 1
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        abandoned = [task for task in tasks if not task.done()]
+        for task in abandoned:
+            task.cancel()
+        if abandoned and on_abandoned is not None:
+            on_abandoned(len(abandoned))
+        _recent_hedges.append(hedged)
+        if is_probe:
+            circuit_breaker.release_probe()
+
+
+def vision_resilience_stats() -> Dict:
+    """Hedging counters, latency percentiles and breaker state."""
+    p50 = latencies.percentile(50)
+    p95 = latencies.percentile(95)
+    p99 = latencies.percentile(99)
+    delay = hedge_delay()
+    return {
+        "hedging": {
+            "enabled": settings.vision_hedge_enabled,
+            "calls": hedge_counts["calls"],
+            "hedges_fired": hedge_counts["fired"],
+            "hedges_won": hedge_counts["won"],
+            "hedges_skipped": hedge_counts["skipped"],
+            "current_delay_s": round(delay, 3) if delay is not None else None,
+        },
+        "latency": {
+            "samples": len(latencies),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+        },
+        "breaker": circuit_breaker.stats(),
+    }
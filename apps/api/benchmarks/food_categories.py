@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: detect_food_category with a large keyword table.
+
+Builds a category table from the bundled categories plus synthetic ones
+totalling --keywords keywords, then times the old nested loop (one
+substring test per keyword) against the Aho-Corasick automaton on a set
+of food names. Both must agree under the automaton's priority rules.
+
+    python benchmarks/food_categories.py [--keywords 10000]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.food_categories import (  # noqa: E402
+    DEFAULT_CATEGORIES_PATH,
+    FoodCategoryTable,
+)
+
+NAMES = [
+    "steamed basmati rice",
+    "dal tadka",
+    "butter naan",
+    "pepperoni pizza",
+    "sliced mango",
+    "chicken tikka masala",
+    "lentil soup with rice",
+    "grilled paneer skewers",
+    "mixed vegetable sabzi",
+    "chocolate chip cookie",
+]
+
+ALPHABET = "abcdefghiklmnoprstuvy"
+
+
+def build_categories(keyword_count: int, seed: int = 7):
+    with open(DEFAULT_CATEGORIES_PATH, "r", encoding="utf-8") as f:
+        categories = json.load(f)["categories"]
+    rng = random.Random(seed)
+    total = sum(len(c["keywords"]) for c in categories.values())
+    index = 0
+    while total < keyword_count:
+        keywords = [
+            "".join(rng.choice(ALPHABET) for _ in range(rng.randint(5, 10)))
+            for _ in range(min(50, keyword_count - total))
+        ]
+        categories[f"cuisine_{index}"] = {
+            "keywords": keywords,
+            "unit_weights": {"serving": 150.0},
+        }
+        total += len(keywords)
+        index += 1
+    return categories
+
+
+def linear_detect(categories, food_name):
+    """The previous implementation, ranked by the same priority rules."""
+    food_name = food_name.lower()
+    best = None
+    for order, (category, config) in enumerate(categories.items()):
+        for keyword in config["keywords"]:
+            start = food_name.find(keyword)
+            if start < 0:
+                continue
+            rank = (config.get("priority", 0), len(keyword), -start, -order)
+            if best is None or rank > best[0]:
+                best = (rank, category)
+    return best[1] if best else None
+
+
+def time_us(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keywords", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    categories = build_categories(args.keywords)
+    started = time.perf_counter()
+    table = FoodCategoryTable(categories)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    print("=" * 60)
+    print(
+        f"Food category benchmark ({len(categories)} categories, "
+        f"{table.keyword_count} keywords)"
+    )
+    print("=" * 60)
+    print(f"  automaton build: {build_ms:.0f} ms ({len(table._automaton)} states)")
+
+    for name in NAMES:
+        expected = linear_detect(categories, name)
+        assert table.detect(name) == expected, (name, table.detect(name), expected)
+
+    linear = statistics.mean(
+        time_us(lambda: linear_detect(categories, name), args.repeat) for name in NAMES
+    )
+    automaton = statistics.mean(
+        time_us(lambda: table.detect(name), args.repeat) for name in NAMES
+    )
+    print(f"  nested loop: {linear:9.1f} us per name")
+    print(f"  automaton:   {automaton:9.1f} us per name")
+    print(f"  speedup:     {linear / automaton:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
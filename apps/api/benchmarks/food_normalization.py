@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: food name normalization latency with a large rules table.
+
+Builds a FoodNameNormalizer from the bundled rules plus --rules synthetic
+multi-word rules, then times uncached lookups (memo bypassed) for exact,
+fuzzy, misspelled and unmatched names. Synthetic rules mix a few very
+common words with a long tail of rare ones, like real food descriptions;
+--dense draws every word from the 50 common ones (worst case).
+
+    python benchmarks/food_normalization.py [--rules 30000]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.food_normalizer import (  # noqa: E402
+    DEFAULT_RULES_PATH,
+    FoodNameNormalizer,
+)
+
+WORDS = (
+    "chicken mutton fish egg paneer tofu potato cauliflower spinach okra "
+    "cabbage peas carrot bean lentil chickpea rice wheat millet corn "
+    "masala curry korma kadai tikka makhani vindaloo saag kofta pakora "
+    "roasted grilled baked tandoori spicy sweet sour creamy dry gravy "
+    "coconut tomato onion garlic ginger mint coriander cumin mustard"
+).split()
+
+QUERIES = [
+    "Dal Tadka",
+    "yellow dal",
+    "Chicken Biriyani",
+    "steamed white rice",
+    "chiken curry",
+    "garlic naans",
+    "spicy paneer kofta gravy",
+    "roasted cumin cauliflower",
+    "rice pudding",
+    "quinoa salad",
+    "curd rice",
+    "rice",
+]
+
+
+def build_rules(count: int, dense: bool, seed: int = 7):
+    rng = random.Random(seed)
+    rare = [
+        "".join(rng.choice("abcdefghiklmnoprstuv") for _ in range(rng.randint(5, 9)))
+        for _ in range(count // 4)
+    ]
+    rules = {}
+    while len(rules) < count:
+        if dense:
+            words = rng.sample(WORDS, rng.randint(2, 4))
+        else:
+            words = rng.sample(WORDS, rng.randint(1, 2)) + rng.sample(
+                rare, rng.randint(1, 2)
+            )
+        name = " ".join(words)
+        rules[name] = f"{name}, cooked"
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rules", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--dense", action="store_true")
+    args = parser.parse_args()
+
+    with open(DEFAULT_RULES_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rules = build_rules(args.rules, args.dense)
+    rules.update(data["rules"])
+
+    started = time.perf_counter()
+    normalizer = FoodNameNormalizer(
+        rules,
+        synonyms=data["synonyms"],
+        plurals=data["plurals"],
+        invariants=data["invariants"],
+        descriptors=data["descriptors"],
+        token_threshold=0.6,
+    )
+    build_ms = (time.perf_counter() - started) * 1000
+
+    print("=" * 60)
+    kind = "dense" if args.dense else "long-tail"
+    print(f"Food normalization benchmark ({len(rules)} {kind} rules)")
+    print("=" * 60)
+    print(f"  index build: {build_ms:.0f} ms")
+    timings = []
+    for query in QUERIES:
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = normalizer._normalize(query)  # Bypass the memo
+            samples.append((time.perf_counter() - started) * 1_000_000)
+        timings.extend(samples)
+        print(f"  {query!r:28} {statistics.median(samples):8.1f} us -> {result!r}")
+
+    timings.sort()
+    print(f"  p50: {timings[len(timings) // 2]:.1f} us")
+    print(f"  p99: {timings[int(len(timings) * 0.99)]:.1f} us")
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for query in QUERIES:
+            normalizer.normalize(query)
+    memo_us = (time.perf_counter() - started) * 1_000_000 / (args.repeat * len(QUERIES))
+    print(f"  memoized: {memo_us:.2f} us per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark: loading a meal log history as ORM objects vs projected rows.
+
+Fills a temporary SQLite database with --rows meal logs of one user (each
+with --items food items in its items JSON) and times reading and
+serializing the whole history, newest first, as GET /log does:
+
+  orm full          db.query(MealLog), every column, ORM instances
+  projected full    the columns of every field, as plain rows
+  projected summary fields=total_calories,created_at (items not read)
+
+Each run uses a new session, so no run is served from the identity map.
+Photo keys are left empty to keep URL signing out of the comparison.
+
+    python benchmarks/meal_log_projection.py [--rows 5000] [--items 6]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+workdir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.models import Base, MealLog, User  # noqa: E402
+from app.routers.log import LOG_COLUMNS, parse_fields, serialize_log  # noqa: E402
+
+
+def seed(rows: int, items: int) -> int:
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        started = datetime(2026, 1, 1)
+        db.bulk_insert_mappings(
+            MealLog,
+            [
+                {
+                    "user_id": user.id,
+                    "created_at": started + timedelta(hours=i),
+                    "total_calories": 450.0 + i % 300,
+                    "items": [
+                        {
+                            "name": f"Food {j}",
+                            "normalized_name": f"food {j}, cooked",
+                            "portion": "1 cup",
+                            "grams": 158.0,
+                            "calories": 205.0,
+                            "protein": 4.3,
+                            "carbs": 44.5,
+                            "fat": 0.4,
+                            "confidence": 0.9,
+                            "cooking_style": None,
+                        }
+                        for j in range(items)
+                    ],
+                    "plate_size_cm": 26.0,
+                }
+                for i in range(rows)
+            ],
+        )
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def load(user_id: int, fields, orm: bool):
+    db = SessionLocal()
+    try:
+        if orm:
+            query = db.query(MealLog)
+        else:
+            query = db.query(*(LOG_COLUMNS[name] for name in fields))
+        rows = (
+            query.filter(MealLog.user_id == user_id)
+            .order_by(MealLog.created_at.desc(), MealLog.id.desc())
+            .all()
+        )
+        return [serialize_log(row, None, fields) for row in rows]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--items", type=int, default=6)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    user_id = seed(args.rows, args.items)
+    modes = [
+        ("orm full", parse_fields(None), True),
+        ("projected full", parse_fields(None), False),
+        ("projected summary", parse_fields("total_calories,created_at"), False),
+    ]
+
+    print("=" * 60)
+    print(f"Meal log projection benchmark ({args.rows} rows, {args.items} items each)")
+    print("=" * 60)
+
+    baseline = None
+    for label, fields, orm in modes:
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = load(user_id, fields, orm)
+            timings.append(time.perf_counter() - started)
+        assert len(result) == args.rows
+        median_ms = statistics.median(timings) * 1000
+        baseline = baseline or median_ms
+        print(f"  {label:18} {median_ms:8.1f} ms  ({baseline / median_ms:4.1f}x)")
+
+    # The projected rows serialize exactly like the ORM objects
+    assert load(user_id, parse_fields(None), True) == load(
+        user_id, parse_fields(None), False
+    )
+    print("  projected full matches orm full: yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batch vs scalar portion and macro computation.
+
+Prices --items random items (quantities, per-100g nutrients, cooking
+styles) with the scalar path (get_portion_grams + calculate_calories +
+round per macro) and with parse_portion + compute_portions_batch, checks
+that every result is identical, and compares the time per item. The
+batch arithmetic includes building the input and output lists.
+
+    python benchmarks/portion_batch.py [--items 100000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.nutrition import (  # noqa: E402
+    calculate_calories,
+    compute_portions_batch,
+    cooking_style_multiplier,
+    get_portion_grams,
+    parse_portion,
+)
+
+FOODS = ["rice, white, cooked long grain", "lentils, cooked", "naan", "apple, raw"]
+UNITS = ["cup", "bowl", "piece", "slice", "tbsp", "serving", "plate"]
+STYLES = [None, "fried", "curry", "restaurant style", "baked", "steamed"]
+
+
+def build_items(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        quantity = rng.choice(["1", "2", "0.5", "1.5", "3", "0.25"])
+        items.append(
+            {
+                "food": rng.choice(FOODS),
+                "portion": f"{quantity} {rng.choice(UNITS)}",
+                "serving_grams": rng.choice([None, None, 30.0, 113.4]),
+                "kcal": round(rng.uniform(0, 600), rng.choice([0, 1, 2])),
+                "protein": round(rng.uniform(0, 40), 2),
+                "carbs": round(rng.uniform(0, 90), 2),
+                "fat": round(rng.uniform(0, 50), 2),
+                "style": rng.choice(STYLES),
+            }
+        )
+    return items
+
+
+def scalar(items):
+    results = []
+    for item in items:
+        grams = get_portion_grams(item["food"], item["portion"], item["serving_grams"])
+        scale = grams / 100.0
+        results.append(
+            (
+                grams,
+                calculate_calories(grams, item["kcal"], item["style"]),
+                round(item["protein"] * scale, 1),
+                round(item["carbs"] * scale, 1),
+                round(item["fat"] * scale, 1),
+            )
+        )
+    return results
+
+
+def parse(items):
+    return [parse_portion(i["food"], i["portion"], i["serving_grams"]) for i in items]
+
+
+def batch(items, portions):
+    result = compute_portions_batch(
+        quantities=[q for q, _ in portions],
+        grams_per_unit=[g for _, g in portions],
+        kcal_per_100g=[i["kcal"] for i in items],
+        protein_per_100g=[i["protein"] for i in items],
+        carbs_per_100g=[i["carbs"] for i in items],
+        fat_per_100g=[i["fat"] for i in items],
+        multipliers=[cooking_style_multiplier(i["style"]) for i in items],
+    )
+    return list(zip(*(column.tolist() for column in result)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    args = parser.parse_args()
+
+    items = build_items(args.items)
+
+    print("=" * 60)
+    print(f"Portion batch benchmark ({len(items)} items)")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    expected = scalar(items)
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    portions = parse(items)
+    parse_s = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = batch(items, portions)
+    batch_s = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    per_item = 1e6 / len(items)
+    print(f"  scalar:             {scalar_s * per_item:6.2f} us per item")
+    print(f"  batch (parse):      {parse_s * per_item:6.2f} us per item")
+    print(f"  batch (arithmetic): {batch_s * per_item:6.2f} us per item")
+    print(f"  mismatches: {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: database round trips per scan.
+
+Runs the /scan pipeline (run_scan) against an in-memory SQLite database
+using the fake vision provider, with USDA lookups and S3 upload stubbed
+out, and counts commits, flushes and SQL statements per scan.
+
+    python benchmarks/scan_commits.py [--scans 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["VISION_PROVIDER"] = "fake"
+os.environ["VISION_FAKE_LATENCY_MS"] = "0"
+os.environ["VISION_FAKE_LATENCY_JITTER_MS"] = "0"
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.models import Base, User  # noqa: E402
+from app.services import scan_pipeline, vision  # noqa: E402
+
+
+async def _nutrition(names, on_result=None):
+    results = []
+    for index, _ in enumerate(names):
+        nutrition = {
+            "kcal": 120.0,
+            "protein": 4.0,
+            "carbs": 20.0,
+            "fat": 2.0,
+            "serving_grams": None,
+        }
+        if on_result:
+            await on_result(index, nutrition)
+        results.append(nutrition)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scans", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    vision.get_usda_nutrition_batch = _nutrition
+    scan_pipeline.upload_image = lambda key, data, content_type: key
+    scan_pipeline.get_s3_url = lambda key: key
+
+    counts = {"commits": 0, "flushes": 0, "statements": 0}
+
+    @event.listens_for(Session, "after_commit")
+    def _count_commit(session):
+        counts["commits"] += 1
+
+    @event.listens_for(Session, "after_flush")
+    def _count_flush(session, flush_context):
+        counts["flushes"] += 1
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        counts["statements"] += 1
+
+    db = SessionLocal()
+    user = User(email="bench@example.com", hashed_password="x", scans_remaining=10**6)
+    db.add(user)
+    db.commit()
+    for key in counts:
+        counts[key] = 0
+
+    async def run():
+        for i in range(args.scans):
+            # Unique bytes per scan so every scan is a cache miss
+            await scan_pipeline.run_scan(
+                db, user, b"image-%d" % i, "image/jpeg", "high"
+            )
+
+    asyncio.run(run())
+    db.close()
+
+    print("=" * 60)
+    print(f"Scan persistence benchmark ({args.scans} scans, all cache misses)")
+    print("=" * 60)
+    for key, value in counts.items():
+        print(f"{key:>12}: {value / args.scans:.2f} per scan")
+
+
+if __name__ == "__main__":
+    main()
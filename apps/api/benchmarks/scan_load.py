@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /scan latency and throughput under concurrent load.
+
+Drives a running API server with concurrent POST /scan requests. Start
+the server with VISION_PROVIDER=fake (or replay) so the USDA, S3 and
+database stages are exercised without OpenAI calls, e.g.
+
+    VISION_PROVIDER=fake uvicorn app.main:app --workers 4
+    python benchmarks/scan_load.py --token <jwt> --image plate.jpg \\
+        --requests 200 --concurrency 20
+
+The test user needs at least --requests scans remaining.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(args):
+    image = Path(args.image).read_bytes()
+    headers = {"Authorization": f"Bearer {args.token}"}
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async with httpx.AsyncClient(
+        base_url=args.url, headers=headers, timeout=args.timeout
+    ) as client:
+
+        async def scan(i: int):
+            # Vary the plate size so requests miss the scan cache and
+            # are not coalesced, unless --same-image is given
+            data = {} if args.same_image else {"plate_size_cm": str(20 + i * 1e-6)}
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/scan",
+                        files={"image": ("plate.jpg", image, "image/jpeg")},
+                        data=data,
+                    )
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                    return
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(scan(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    print("=" * 60)
+    print(
+        f"/scan load test ({args.requests} requests, concurrency {args.concurrency})"
+    )
+    print("=" * 60)
+    print(f"  throughput: {args.requests / elapsed:.1f} req/s")
+    if latencies:
+        print(f"    mean: {statistics.mean(latencies):8.1f} ms")
+        for pct in (50, 95, 99):
+            print(f"     p{pct}: {percentile(latencies, pct):8.1f} ms")
+        print(f"     max: {max(latencies):8.1f} ms")
+    print(f"  statuses: {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="JWT of the test user")
+    parser.add_argument("--image", required=True, help="JPEG/PNG plate photo")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument(
+        "--same-image",
+        action="store_true",
+        help="Send identical requests (measures cache hits and coalescing)",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark: USDA bytes per scan, search-per-item vs FDC index + bulk fetch.
+
+Starts a local HTTP stub of the FoodData Central API (/foods/search with
+50 full hits per query, POST /foods honouring the nutrients filter) and
+points the app at it with USDA_API_BASE_URL. For one scan's food names it
+counts requests and response bytes for:
+
+  search per item   the previous path, one search per name
+  cold index        names not indexed yet: searches, then one bulk fetch
+  warm index        names indexed: one bulk /foods request
+
+and checks the nutrition matches what the search hits contain.
+
+    python benchmarks/usda_bulk.py [--items 6]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+NAMES = [
+    "rice, white, cooked long grain",
+    "lentils, cooked",
+    "chicken, meat only, cooked, stewed",
+    "bread, whole wheat, commercially prepared",
+    "yogurt, plain, whole milk",
+    "spinach, cooked",
+    "potato, boiled",
+    "cheese, paneer",
+]
+
+# Nutrient id -> (number, name, unit); the stub reports 40 per food like FDC
+NUTRIENTS = {
+    1008: ("208", "Energy", "KCAL"),
+    1003: ("203", "Protein", "G"),
+    1004: ("204", "Total lipid (fat)", "G"),
+    1005: ("205", "Carbohydrate, by difference", "G"),
+}
+NUTRIENTS.update(
+    {2000 + i: (str(300 + i), f"Nutrient {i}", "MG") for i in range(36)}
+)
+
+traffic: Counter = Counter()
+
+
+def stub_food(fdc_id: int):
+    digest = hashlib.sha256(str(fdc_id).encode()).digest()
+    return {
+        "fdcId": fdc_id,
+        "description": f"Food {fdc_id}, " + "generic " * (digest[0] % 4),
+        "dataType": "SR Legacy",
+        "amounts": {
+            nid: round(digest[i % 32] * 1.7, 2) for i, nid in enumerate(NUTRIENTS)
+        },
+    }
+
+
+def search_hit(fdc_id: int):
+    food = stub_food(fdc_id)
+    return {
+        "fdcId": fdc_id,
+        "description": food["description"],
+        "dataType": food["dataType"],
+        "publishedDate": "2019-04-01",
+        "foodNutrients": [
+            {
+                "nutrientId": nid,
+                "nutrientName": NUTRIENTS[nid][1],
+                "nutrientNumber": NUTRIENTS[nid][0],
+                "unitName": NUTRIENTS[nid][2],
+                "derivationCode": "A",
+                "derivationDescription": "Analytical",
+                "value": amount,
+            }
+            for nid, amount in food["amounts"].items()
+        ],
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, kind: str, payload):
+        body = json.dumps(payload).encode()
+        traffic[f"{kind}_requests"] += 1
+        traffic[f"{kind}_bytes"] += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["query"][0]
+        base = int(hashlib.sha256(query.encode()).hexdigest()[:6], 16) * 100
+        self._send("search", {"foods": [search_hit(base + i) for i in range(50)]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        numbers = set(request.get("nutrients") or [])
+        foods = []
+        for fdc_id in request["fdcIds"]:
+            food = stub_food(fdc_id)
+            foods.append(
+                {
+                    "fdcId": fdc_id,
+                    "description": food["description"],
+                    "dataType": food["dataType"],
+                    "foodNutrients": [
+                        {
+                            "number": NUTRIENTS[nid][0],
+                            "name": NUTRIENTS[nid][1],
+                            "amount": amount,
+                            "unitName": NUTRIENTS[nid][2],
+                        }
+                        for nid, amount in food["amounts"].items()
+                        if not numbers or NUTRIENTS[nid][0] in numbers
+                    ],
+                }
+            )
+        self._send("foods", foods)
+
+
+def report(label: str):
+    requests = traffic["search_requests"] + traffic["foods_requests"]
+    kb = (traffic["search_bytes"] + traffic["foods_bytes"]) / 1024
+    print(f"  {label:17} {requests:3d} requests {kb:9.1f} KB")
+    traffic.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=6)
+    args = parser.parse_args()
+    names = NAMES[: args.items]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    workdir = tempfile.mkdtemp()
+    os.environ["USDA_API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["USDA_API_KEY"] = "stub"
+    os.environ["USDA_HTTP2"] = "false"
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["LOCAL_NUTRITION_DB_PATH"] = f"{workdir}/missing.sqlite"
+
+    from app.db import engine  # noqa: E402
+    from app.models import Base  # noqa: E402
+    from app.services import nutrition  # noqa: E402
+    from app.services.http_client import close_usda_client  # noqa: E402
+
+    Base.metadata.create_all(engine)
+
+    names = [nutrition.normalize_food_name(name) for name in names]
+
+    async def run():
+        # Expected values: the chosen search hit's own nutrients
+        expected = {}
+        for name in names:
+            hit = await nutrition.search_usda_food(name)
+            values = {n["nutrientId"]: n["value"] for n in hit["foodNutrients"]}
+            expected[name] = (values[1008], values[1003], values[1005], values[1004])
+        report("search per item")
+
+        for label in ("cold index", "warm index"):
+            nutrition.nutrition_cache.clear()
+            results = await nutrition.get_usda_nutrition_batch(names)
+            report(label)
+            for name, result in zip(names, results):
+                actual = tuple(result[k] for k in ("kcal", "protein", "carbs", "fat"))
+                assert actual == expected[name], (name, actual, expected[name])
+        await close_usda_client()
+
+    print("=" * 60)
+    print(f"USDA bulk lookup benchmark ({len(names)} items per scan)")
+    print("=" * 60)
+    asyncio.run(run())
+    print("  nutrition matches the search hits: yes")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Import USDA FoodData Central bulk downloads into the local nutrition database.
+
+Download the Foundation Foods and SR Legacy datasets (CSV or JSON) from
+https://fdc.nal.usda.gov/download-datasets.html, extract them, then run:
+
+    python import_usda_foods.py path/to/FoodData_Central_foundation_food_csv \\
+        path/to/FoodData_Central_sr_legacy_food_csv
+
+CSV sources are directories containing food.csv / food_nutrient.csv
+(food_portion.csv and measure_unit.csv are optional); JSON sources are the
+.json files themselves. The database is written to LOCAL_NUTRITION_DB_PATH
+unless --output is given.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def main():
+    from app.config import settings
+    from app.services.local_nutrition import build_local_db
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("sources", nargs="+", help="CSV directories or JSON files")
+    parser.add_argument(
+        "--output",
+        default=settings.local_nutrition_db_path,
+        help="SQLite file to create (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("iCalorie USDA Food Import")
+    print("=" * 60)
+
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"❌ Source not found: {source}")
+            return 1
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    try:
+        count = build_local_db(args.sources, args.output)
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        return 1
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Imported {count} foods into {args.output} in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
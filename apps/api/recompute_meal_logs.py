@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Recompute grams, calories and macros of stored meal logs.
+
+Re-runs the nutrition stage of a scan over the items saved in each
+MealLog: names are normalized with the current rules, per-100g nutrition
+is looked up again (local database, cache or USDA) and every item of a
+chunk of logs is priced in one compute_portions_batch call.
+
+Only items that came from a scan (with portion, estimated_grams and
+normalized_name) are recomputed. Items entered by hand through POST /log,
+items saved before cooking_style was stored (their cooking adjustment is
+unknown) and items whose lookup found nothing or failed keep their
+stored values; a log with no recomputed item is left unchanged.
+
+Nothing is written unless --apply is given:
+
+    python recompute_meal_logs.py [--user-id 42] [--batch-size 500] [--apply]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+# Fields every item produced by a scan has set
+SCAN_ITEM_FIELDS = ("portion", "estimated_grams", "normalized_name")
+
+
+def is_recomputable(item: dict) -> bool:
+    return "cooking_style" in item and all(
+        item.get(field) is not None for field in SCAN_ITEM_FIELDS
+    )
+
+
+async def recompute_chunk(logs) -> int:
+    """Recomputes the logs in place; returns how many of them changed."""
+    from app.services.nutrition import (
+        NUTRITION_DEFAULTS,
+        get_usda_nutrition_batch,
+        normalize_food_name,
+    )
+    from app.services.vision import build_food_items
+
+    # (log, item index) of every recomputable item in the chunk
+    positions = [
+        (log, index)
+        for log in logs
+        for index, item in enumerate(log.items)
+        if is_recomputable(item)
+    ]
+    foods = [dict(log.items[index]) for log, index in positions]
+    names = [normalize_food_name(item.get("name") or "Unknown") for item in foods]
+
+    # One lookup per distinct food name in the chunk
+    distinct = list(dict.fromkeys(names))
+    nutritions = await get_usda_nutrition_batch(distinct)
+    # A lookup that found nothing or failed returns the defaults; pricing
+    # an item with them would zero it out
+    nutrition_by_name = {
+        name: nutrition
+        for name, nutrition in zip(distinct, nutritions)
+        if nutrition != NUTRITION_DEFAULTS
+    }
+    resolved = [i for i, name in enumerate(names) if name in nutrition_by_name]
+    items = build_food_items(
+        [foods[i] for i in resolved],
+        [names[i] for i in resolved],
+        [nutrition_by_name[names[i]] for i in resolved],
+    )
+
+    new_items_by_log = {}
+    for i, item in zip(resolved, items):
+        log, index = positions[i]
+        new_items = new_items_by_log.setdefault(log.id, list(log.items))
+        new_items[index] = item.model_dump()
+
+    changed = 0
+    for log in logs:
+        new_items = new_items_by_log.get(log.id)
+        if new_items is None:
+            continue
+        total_calories = round(sum(i.get("calories") or 0 for i in new_items), -1)
+        if new_items != log.items or total_calories != log.total_calories:
+            log.items = new_items
+            log.total_calories = total_calories
+            changed += 1
+    return changed
+
+
+async def recompute(user_id, batch_size: int, apply: bool) -> tuple:
+    from app.db import SessionLocal
+    from app.models import MealLog
+    from app.services.http_client import close_usda_client
+
+    db = SessionLocal()
+    scanned = changed = 0
+    last_id = 0
+    try:
+        while True:
+            query = db.query(MealLog).filter(MealLog.id > last_id)
+            if user_id is not None:
+                query = query.filter(MealLog.user_id == user_id)
+            logs = query.order_by(MealLog.id).limit(batch_size).all()
+            if not logs:
+                break
+            last_id = logs[-1].id
+
+            logs = [log for log in logs if log.items]
+            scanned += len(logs)
+            changed += await recompute_chunk(logs)
+            if apply:
+                db.commit()
+            else:
+                db.rollback()
+            print(f"  ...through log {last_id}: {changed}/{scanned} changed")
+    finally:
+        db.close()
+        await close_usda_client()
+    return scanned, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--user-id", type=int, help="Only this user's logs")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--apply", action="store_true", help="Write the results")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("iCalorie Meal Log Recompute" + ("" if args.apply else " (dry run)"))
+    print("=" * 60)
+
+    started = time.perf_counter()
+    try:
+        scanned, changed = asyncio.run(
+            recompute(args.user_id, args.batch_size, args.apply)
+        )
+    except Exception as e:
+        print(f"❌ Recompute failed: {e}")
+        return 1
+
+    elapsed = time.perf_counter() - started
+    action = "Updated" if args.apply else "Would update"
+    print(f"✅ {action} {changed} of {scanned} meal logs in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
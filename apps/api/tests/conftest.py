@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway database
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db"
+)
+os.environ.setdefault("VISION_PROVIDER", "fake")
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.admission import AdmissionController
+from app.services import vision_resilience
+from app.services.vision_resilience import call_vision
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(settings, "openai_tokens_per_minute", 60000)
+    monkeypatch.setattr(settings, "tokens_per_scan", 3000)
+
+
+def test_failed_call_refunds_reservation(budget):
+    controller = AdmissionController("memory")
+
+    async def failing_call():
+        async with controller.admit(user_id=None):
+            raise ConnectionError("provider unreachable")
+
+    async def run():
+        for _ in range(25):
+            with pytest.raises(ConnectionError):
+                await failing_call()
+        return await controller.bucket.available()
+
+    assert asyncio.run(run()) == pytest.approx(60000, abs=1)
+
+
+def test_reported_usage_settles_reservation(budget):
+    controller = AdmissionController("memory")
+
+    async def run():
+        async with controller.admit(user_id=None) as ticket:
+            ticket.used_tokens = 1000
+        return await controller.bucket.available()
+
+    assert asyncio.run(run()) == pytest.approx(59000, abs=1)
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(settings, "vision_hedge_enabled", True)
+    monkeypatch.setattr(settings, "vision_hedge_min_samples", 1000)
+    monkeypatch.setattr(settings, "vision_hedge_max_delay_s", 0.01)
+    monkeypatch.setattr(settings, "vision_hedge_max_ratio", 1.0)
+    vision_resilience._recent_hedges.clear()
+
+
+def _slow_then_fast():
+    calls = []
+
+    async def fn():
+        calls.append(None)
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return "ok"
+
+    return fn, calls
+
+
+def test_losing_hedge_is_charged_at_estimate(budget, hedging):
+    controller = AdmissionController("memory")
+    fn, calls = _slow_then_fast()
+
+    async def run():
+        async with controller.admit(user_id=None) as ticket:
+            await call_vision(
+                fn,
+                reserve_hedge=lambda: controller.reserve_hedge(ticket),
+                on_abandoned=ticket.abandon,
+            )
+            ticket.used_tokens = 1000
+        return await controller.bucket.available()
+
+    # The winner's usage plus the cancelled primary's estimate (the bucket
+    # refills a little meanwhile)
+    assert asyncio.run(run()) == pytest.approx(56000, abs=100)
+    assert len(calls) == 2
+
+
+def test_hedge_skipped_without_budget(budget, hedging, monkeypatch):
+    monkeypatch.setattr(settings, "openai_tokens_per_minute", 3000)
+    controller = AdmissionController("memory")
+    fn, calls = _slow_then_fast()
+
+    async def run():
+        async with controller.admit(user_id=None) as ticket:
+            await call_vision(
+                fn,
+                reserve_hedge=lambda: controller.reserve_hedge(ticket),
+                on_abandoned=ticket.abandon,
+            )
+            ticket.used_tokens = 3000
+
+    asyncio.run(run())
+    assert len(calls) == 1
+    assert controller.counts["hedges_denied"] == 1
@@ -0,0 +1,23 @@
+import pytest
+
+from app.services.food_normalizer import food_normalizer
+
+
+@pytest.mark.parametrize("name", ["curd rice", "rajma rice", "chicken curry rice"])
+def test_mixed_dish_does_not_match_a_component(name):
+    assert food_normalizer.match(name) is None
+    assert food_normalizer.normalize(name) == name
+
+
+@pytest.mark.parametrize(
+    "name, value",
+    [
+        ("steamed white rice", "rice, white, cooked long grain"),
+        ("Chicken Biriyani", "rice, white, cooked long grain"),
+        ("chiken curry", "chicken, meat only, cooked, stewed"),
+        ("garlic naans", "naan"),
+        ("Dal Tadka", "lentils, cooked"),
+    ],
+)
+def test_variants_match_their_rule(name, value):
+    assert food_normalizer.normalize(name) == value
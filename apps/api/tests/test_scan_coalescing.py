@@ -0,0 +1,66 @@
+import asyncio
+import os
+
+import pytest
+
+from app.config import settings
+from app.db import SessionLocal, engine
+from app.models import Base, MealLog, TokenUsage, User
+from app.services import scan_pipeline, vision
+
+
+async def fake_nutrition(names, on_result=None):
+    results = []
+    for i, _ in enumerate(names):
+        nutrition = {"kcal": 100.0, "protein": 1.0, "carbs": 1.0, "fat": 1.0}
+        if on_result is not None:
+            await on_result(i, nutrition)
+        results.append(nutrition)
+    return results
+
+
+@pytest.fixture
+def user_id(monkeypatch):
+    monkeypatch.setattr(settings, "scan_coalesce_mode", "local")
+    monkeypatch.setattr(settings, "vision_fake_latency_ms", 200)
+    monkeypatch.setattr(scan_pipeline, "upload_image", lambda key, data, ct: key)
+    monkeypatch.setattr(vision, "get_usda_nutrition_batch", fake_nutrition)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = User(
+        email=f"{os.urandom(4).hex()}@example.com",
+        hashed_password="x",
+        scans_remaining=10,
+    )
+    db.add(user)
+    db.commit()
+    yield user.id
+    db.close()
+
+
+def test_concurrent_identical_scans_are_charged_once(user_id):
+    image = os.urandom(64)
+
+    async def scan():
+        # One session per request, as with get_db
+        db = SessionLocal()
+        try:
+            user = db.get(User, user_id)
+            return await scan_pipeline.run_scan(db, user, image, "image/jpeg", "low")
+        finally:
+            db.close()
+
+    async def run():
+        return await asyncio.gather(*(scan() for _ in range(4)))
+
+    responses = asyncio.run(run())
+    assert len({r.log_id for r in responses}) == 1
+    assert sum(r.coalesced for r in responses) == 3
+
+    db = SessionLocal()
+    try:
+        assert db.query(MealLog).filter(MealLog.user_id == user_id).count() == 1
+        assert db.query(TokenUsage).filter(TokenUsage.user_id == user_id).count() == 1
+        assert db.get(User, user_id).scans_remaining == 9
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.services.single_flight import PostgresAdvisoryLock
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(
+    not POSTGRES_URL, reason="TEST_POSTGRES_URL not set"
+)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setattr(settings, "scan_coalesce_wait_s", 0.5)
+    monkeypatch.setattr(settings, "scan_coalesce_poll_s", 0.05)
+    engine = create_engine(POSTGRES_URL, pool_size=2, max_overflow=0)
+    make_session = sessionmaker(bind=engine)
+    leader, follower = make_session(), make_session()
+    yield leader, follower
+    leader.close()
+    follower.close()
+    engine.dispose()
+
+
+def test_lock_is_held_until_the_leader_commits(sessions):
+    leader, follower = sessions
+
+    async def run():
+        async with PostgresAdvisoryLock(leader, "scan:1:abc") as lock:
+            assert lock.acquired and not lock.waited
+
+        # Still held: the leader's transaction is open
+        async with PostgresAdvisoryLock(follower, "scan:1:abc") as lock:
+            assert not lock.acquired and lock.waited
+        follower.rollback()
+
+        leader.commit()
+        async with PostgresAdvisoryLock(follower, "scan:1:abc") as lock:
+            assert lock.acquired
+        follower.commit()
+
+    asyncio.run(run())
+
+
+def test_lock_uses_no_extra_connection(sessions):
+    leader, follower = sessions
+
+    async def run():
+        # Both sessions hold their pool's only two connections
+        async with PostgresAdvisoryLock(leader, "scan:1:a") as first:
+            async with PostgresAdvisoryLock(follower, "scan:1:b") as second:
+                assert first.acquired and second.acquired
+        leader.commit()
+        follower.commit()
+
+    asyncio.run(run())